@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+"""
+Benchmark harness for every /api/* route and for tracker ingest.
+
+For each requested history size a synthetic database is generated (see
+synth.py), placed in a throwaway data dir, and every scenario is timed
+through the Flask test client. Results are written as JSON so runs can be
+diffed over time.
+
+Usage:
+  python benchmarks/run.py --years 1 5 10 --repeat 5 --output bench.json
+  python benchmarks/run.py --years 0.25 --only analytics
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import argparse
+import datetime
+import statistics
+import subprocess
+import tempfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+# Point the app at a throwaway data dir *before* webapp is imported, so the
+# benchmark never touches ~/.studytrack or talks to a running tracker daemon.
+BENCH_HOME = tempfile.mkdtemp(prefix='studytrack-bench-')
+os.environ['HOME'] = BENCH_HOME
+
+from benchmarks.synth import generate, remove_db  # noqa: E402
+from webapp import backup, routes  # noqa: E402
+from webapp.journal import journal_for  # noqa: E402
+from webapp.tracker import ActivityTracker  # noqa: E402
+
+
+def _timed(fn, repeat):
+    samples = []
+    size = 0
+    for i in range(repeat):
+        t0 = time.perf_counter()
+        size = fn(i)
+        samples.append((time.perf_counter() - t0) * 1000)
+    return {
+        'repeat': repeat,
+        'min_ms': round(min(samples), 3),
+        'median_ms': round(statistics.median(samples), 3),
+        'mean_ms': round(statistics.mean(samples), 3),
+        'max_ms': round(max(samples), 3),
+        'bytes': size
+    }
+
+
+def _get(client, url, headers=None):
+    def run(i):
+        res = client.get(url, headers=headers)
+        assert res.status_code == 200, (url, res.status_code)
+        return len(res.data)
+    return run
+
+
+def _post(client, url, body_fn):
+    def run(i):
+        res = client.post(url, json=body_fn(i))
+        assert res.status_code == 200, (url, res.status_code)
+        return len(res.data)
+    return run
+
+
+def _db_scalar(sql, params=()):
+    import sqlite3
+    conn = sqlite3.connect(routes.DB_FILE)
+    value = conn.execute(sql, params).fetchone()[0]
+    conn.close()
+    return value
+
+
+def scenarios(client):
+    """Yields (name, fn). Read-only scenarios first, mutating ones last."""
+    newest = _db_scalar('SELECT MAX(id) FROM sessions')
+    longest = _db_scalar('SELECT id FROM sessions ORDER BY duration DESC LIMIT 1')
+    first_day = datetime.date.fromtimestamp(_db_scalar('SELECT MIN(start_ts) FROM sessions'))
+
+    yield 'status', _get(client, '/api/status')
+    yield 'tags', _get(client, '/api/tags')
+    yield 'metrics', _get(client, '/api/metrics')
+    yield 'dashboard_stats', _get(client, '/api/dashboard_stats')
+    yield 'all_sessions', _get(client, '/api/all_sessions')
+    yield 'all_sessions_name_filter', _get(client, '/api/all_sessions?name=Thesis')
+    yield 'all_sessions_tag_filter', _get(client, '/api/all_sessions?tag=math')
+    yield 'dashboard_stats_compact', _get(client, '/api/dashboard_stats?format=compact')
+    yield 'all_sessions_compact', _get(client, '/api/all_sessions?format=compact')
+    yield 'all_sessions_compact_gzip', _get(client, '/api/all_sessions?format=compact', {'Accept-Encoding': 'gzip'})
+    yield 'session_summary_latest', _get(client, f'/api/session/{newest}/summary')
+    yield 'session_summary_longest', _get(client, f'/api/session/{longest}/summary')
+    yield 'session_timeline_longest', _get(client, f'/api/session/{longest}/timeline?points=200')
+    for range_type in ('daily', 'weekly', 'monthly', 'yearly'):
+        yield f'analytics_{range_type}', _get(client, f'/api/analytics/summary?range_type={range_type}')
+    full_range = f'range_type=custom&start_date={first_day:%Y-%m-%d}&end_date={datetime.date.today():%Y-%m-%d}'
+    yield 'analytics_all_time', _get(client, f'/api/analytics/summary?{full_range}')
+    yield 'analytics_all_time_tag', _get(client, f'/api/analytics/summary?{full_range}&tag=math')
+    yield 'heatmap_year', _get(client, '/api/heatmap')
+    yield 'streaks', _get(client, '/api/streaks')
+    yield 'analytics_all_time_compact', _get(client, f'/api/analytics/summary?{full_range}&format=compact')
+
+    # Mutations: each repeat works on its own session
+    started = []
+
+    def start(i):
+        res = client.post('/api/start', json={'name': f'bench {i}', 'tags': 'bench'})
+        started.append(res.get_json()['session']['id'])
+        return len(res.data)
+    yield 'start', start
+    yield 'pause', _post(client, '/api/pause', lambda i: {'session_id': started[i]})
+    yield 'resume', _post(client, '/api/resume', lambda i: {'session_id': started[i]})
+    yield 'stop', _post(client, '/api/stop', lambda i: {'session_id': started[i]})
+    yield 'delete_oldest', _post(client, '/api/session/delete', lambda i: {'session_id': 1 + i})
+    jobs = []
+
+    def bulk_delete(i):
+        res = client.post('/api/sessions/bulk_delete', json={'session_ids': [started[i]]})
+        assert res.status_code == 200, ('/api/sessions/bulk_delete', res.status_code)
+        jobs.append(res.get_json()['job_id'])
+        return len(res.data)
+    yield 'bulk_delete', bulk_delete
+    yield 'delete_job_status', lambda i: _get(client, f'/api/delete_jobs/{jobs[i]}')(i)
+    yield 'backup_status', _get(client, '/api/backup/status')
+    # Only the first repeat starts a backup; the rest find it running
+    yield 'backup_request', _post(client, '/api/backup', lambda i: {})
+
+
+def bench_ingest(samples):
+    """Times ActivityTracker's write path (journal append + replay into the DB) for a number of samples."""
+    sid = _db_scalar('SELECT MAX(id) FROM sessions')
+    tracker = ActivityTracker(session_id=sid, db_file=routes.DB_FILE)
+    t0 = time.perf_counter()
+    for i in range(samples):
+        tracker._log_activity_to_db('code', f'bench.py - {i % 10}')
+    tracker._drain(timeout=5.0) # Include replaying whatever is still journaled
+    elapsed = time.perf_counter() - t0
+    return {
+        'samples': samples,
+        'total_ms': round(elapsed * 1000, 3),
+        'per_sample_ms': round(elapsed * 1000 / samples, 4),
+        'samples_per_sec': round(samples / elapsed, 1)
+    }
+
+
+def _wait_background(timeout=600.0):
+    """
+    Stops the tracker and waits for delete jobs and backups started by the
+    scenarios, so they neither skew later timings nor write into the next
+    dataset's database.
+    """
+    routes.tracker_command('stop')
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        pending = _db_scalar("SELECT COUNT(*) FROM delete_jobs WHERE status IN ('pending', 'running')")
+        status = backup.start_worker(routes.DB_FILE).status()
+        if not pending and not status['running'] and not status['queued']:
+            return
+        time.sleep(0.05)
+    raise RuntimeError(f"background work still running after {timeout:.0f}s")
+
+
+def _git_rev():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, text=True).strip()
+    except Exception:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--years', type=float, nargs='+', default=[1.0])
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--sample-hz', type=float, default=1.0)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--ingest-samples', type=int, default=500)
+    parser.add_argument('--only', default=None, help='run only scenarios whose name contains this')
+    parser.add_argument('--cache-dir', default=None, help='reuse generated databases from this dir')
+    parser.add_argument('--output', default=None, help='write JSON here instead of stdout')
+    args = parser.parse_args()
+
+    app = routes.create_app()
+    client = app.test_client()
+    end_date = datetime.date.today()
+
+    report = {
+        'generated_at': datetime.datetime.now().isoformat(timespec='seconds'),
+        'git_rev': _git_rev(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'seed': args.seed,
+        'end_date': end_date.isoformat(),
+        'datasets': []
+    }
+
+    for years in args.years:
+        name = f'synth_{years:g}y_seed{args.seed}_{end_date:%Y%m%d}.db'
+        cached = Path(args.cache_dir) / name if args.cache_dir else None
+        t0 = time.perf_counter()
+        # The journal's replay offset lives in the database being replaced
+        os.truncate(journal_for(routes.DB_FILE).path, 0)
+        if cached and cached.exists():
+            remove_db(routes.DB_FILE)
+            shutil.copyfile(cached, routes.DB_FILE)
+            counts = None
+        else:
+            counts = generate(routes.DB_FILE, years, args.seed, end_date, args.sample_hz)
+            if cached:
+                cached.parent.mkdir(parents=True, exist_ok=True)
+                shutil.copyfile(routes.DB_FILE, cached)
+        gen_seconds = time.perf_counter() - t0
+        if counts is None:
+            counts = {t: _db_scalar(f'SELECT COUNT(*) FROM {t}') for t in ('sessions', 'breaks', 'activity_log')}
+        print(f"[bench] {years:g} years: {counts} ({gen_seconds:.1f}s)", file=sys.stderr)
+
+        results = {}
+        for scenario, fn in scenarios(client):
+            if args.only and args.only not in scenario:
+                continue
+            results[scenario] = _timed(fn, args.repeat)
+            print(f"[bench]   {scenario}: {results[scenario]['median_ms']} ms", file=sys.stderr)
+        _wait_background()
+        if not args.only or args.only in 'tracker_ingest':
+            results['tracker_ingest'] = bench_ingest(args.ingest_samples)
+
+        report['datasets'].append({
+            'years': years,
+            'rows': counts,
+            'db_bytes': os.path.getsize(routes.DB_FILE),
+            'generate_seconds': round(gen_seconds, 2),
+            'scenarios': results
+        })
+
+    out = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(out)
+    else:
+        print(out)
+    shutil.rmtree(BENCH_HOME, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
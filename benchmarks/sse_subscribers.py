@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Load test for the ASGI server: holds thousands of idle /api/status/stream
+subscribers open and reports the server's memory and thread count.
+
+Starts `studytrack.py --runserver --asgi` against a throwaway data dir, so it
+never touches ~/.studytrack. Requires uvicorn.
+
+Usage:
+  python benchmarks/sse_subscribers.py --clients 2000 --hold 10
+"""
+import os
+import sys
+import json
+import time
+import socket
+import asyncio
+import argparse
+import resource
+import tempfile
+import subprocess
+from pathlib import Path
+
+import psutil
+
+ROOT = Path(__file__).resolve().parent.parent
+PORT = 8080
+
+
+def wait_for_port(port, timeout=15.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=0.5):
+                return True
+        except OSError:
+            time.sleep(0.2)
+    return False
+
+
+async def subscribe(port, events):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    writer.write(b'GET /api/status/stream HTTP/1.1\r\nHost: localhost\r\nAccept: text/event-stream\r\n\r\n')
+    await writer.drain()
+    try:
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            if line.startswith(b'data: '):
+                events[0] += 1
+    except asyncio.CancelledError:
+        pass
+    finally:
+        writer.close()
+
+
+async def run_clients(port, clients, hold):
+    events = [0]
+    tasks = []
+    for i in range(clients):
+        tasks.append(asyncio.ensure_future(subscribe(port, events)))
+        if i % 200 == 199:
+            await asyncio.sleep(0.05) # Don't overflow the listen backlog
+    await asyncio.sleep(hold)
+    return tasks, events
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--clients', type=int, default=2000)
+    parser.add_argument('--hold', type=float, default=10.0, help='seconds to keep the subscribers open')
+    args = parser.parse_args()
+
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    wanted = min(hard, args.clients + 256)
+    if soft < wanted:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (wanted, hard))
+
+    home = tempfile.mkdtemp(prefix='studytrack-bench-')
+    env = dict(os.environ, HOME=home)
+    server = subprocess.Popen(
+        [sys.executable, str(ROOT / 'studytrack.py'), '--runserver', '--asgi'],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        preexec_fn=lambda: resource.setrlimit(resource.RLIMIT_NOFILE, (wanted, hard))
+    )
+    try:
+        if not wait_for_port(PORT):
+            print("Server did not start (is uvicorn installed?)", file=sys.stderr)
+            sys.exit(1)
+        proc = psutil.Process(server.pid)
+        baseline_rss = proc.memory_info().rss
+
+        loop = asyncio.new_event_loop()
+        tasks, events = loop.run_until_complete(run_clients(PORT, args.clients, args.hold))
+        loaded_rss = proc.memory_info().rss
+        threads = proc.num_threads()
+        connections = len([c for c in proc.connections() if c.status == psutil.CONN_ESTABLISHED])
+
+        for t in tasks:
+            t.cancel()
+        loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+        loop.close()
+
+        print(json.dumps({
+            'clients': args.clients,
+            'hold_seconds': args.hold,
+            'established_connections': connections,
+            'events_received': events[0],
+            'server_threads': threads,
+            'rss_baseline_mb': round(baseline_rss / 2**20, 1),
+            'rss_loaded_mb': round(loaded_rss / 2**20, 1),
+            'rss_per_subscriber_kb': round((loaded_rss - baseline_rss) / 1024 / max(1, args.clients), 2)
+        }, indent=2))
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == '__main__':
+    main()
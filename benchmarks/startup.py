@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Startup-time benchmark and guard for the lightweight CLI control path.
+
+Times `studytrack.py --status`, `--status --json` and `--stop` (against an
+empty data dir, so nothing is running) and checks that none of them import
+Flask, psutil, sqlite3 or the web routes. Exits non-zero if a heavy module
+sneaks back in or the median exceeds --budget-ms.
+
+Usage:
+  python benchmarks/startup.py --runs 20 --budget-ms 150
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+import subprocess
+import tempfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+SCRIPT = ROOT / 'studytrack.py'
+
+HEAVY_MODULES = ['flask', 'werkzeug', 'jinja2', 'psutil', 'sqlite3', 'webapp.routes', 'webapp.tracker']
+COMMANDS = {
+    'status': ['--status'],
+    'status_json': ['--status', '--json'],
+    'stop': ['--stop'],
+}
+
+# Runs the CLI in-process and reports which heavy modules ended up imported
+_PROBE = """
+import sys, runpy, io, contextlib, json
+sys.argv = ['studytrack'] + {args!r}
+with contextlib.redirect_stdout(io.StringIO()):
+    runpy.run_path({script!r}, run_name='__main__')
+print(json.dumps([m for m in {heavy!r} if m in sys.modules]))
+"""
+
+
+def time_command(args, env, runs):
+    samples = []
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        subprocess.run([sys.executable, str(SCRIPT)] + args, env=env, cwd=ROOT,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+        samples.append((time.perf_counter() - t0) * 1000)
+    return samples
+
+
+def heavy_imports(args, env):
+    probe = _PROBE.format(args=args, script=str(SCRIPT), heavy=HEAVY_MODULES)
+    out = subprocess.run([sys.executable, '-c', probe], env=env, cwd=ROOT,
+                         capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=20)
+    parser.add_argument('--budget-ms', type=float, default=150.0, help='fail if a median is above this')
+    args = parser.parse_args()
+
+    env = dict(os.environ, HOME=tempfile.mkdtemp(prefix='studytrack-startup-'))
+    interpreter = []
+    for _ in range(args.runs):
+        t0 = time.perf_counter()
+        subprocess.run([sys.executable, '-c', 'pass'], check=True)
+        interpreter.append((time.perf_counter() - t0) * 1000)
+
+    report = {'interpreter_median_ms': round(statistics.median(interpreter), 2), 'commands': {}}
+    failed = False
+    for name, cmd in COMMANDS.items():
+        samples = time_command(cmd, env, args.runs)
+        heavy = heavy_imports(cmd, env)
+        median = statistics.median(samples)
+        ok = not heavy and median <= args.budget_ms
+        failed |= not ok
+        report['commands'][name] = {
+            'median_ms': round(median, 2),
+            'min_ms': round(min(samples), 2),
+            'max_ms': round(max(samples), 2),
+            'heavy_imports': heavy,
+            'ok': ok
+        }
+
+    report['ok'] = not failed
+    print(json.dumps(report, indent=2))
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Deterministic synthetic history generator.
+
+Builds a StudyTrack database with N years of daily sessions, breaks and
+activity samples. The same (years, seed, end date, sample rate) always
+produces the same database.
+
+Usage:
+  python benchmarks/synth.py out.db --years 5 --seed 1
+"""
+import sys
+import time
+import random
+import sqlite3
+import argparse
+import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from webapp import daily
+from webapp.routes import init_db
+
+# (app_name, weight, window titles)
+APPS = [
+    ('code', 30, ['routes.py - Study-Track - Visual Studio Code', 'tracker.py - Study-Track - Visual Studio Code',
+                  'notes.md - thesis - Visual Studio Code', 'main.rs - solver - Visual Studio Code']),
+    ('brave-browser', 18, ['12:04 - Lecture 7: Eigenvalues - YouTube - Brave', 'Stack Overflow - Brave',
+                           'Linear algebra - Wikipedia - Brave', '03:41 - Lofi beats - YouTube - Brave']),
+    ('firefox', 7, ['MDN Web Docs - Mozilla Firefox', 'arXiv.org - Mozilla Firefox']),
+    ('nvim', 12, ['nvim ~/notes/todo.md', 'nvim ~/src/solver/main.c']),
+    ('btop', 2, ['btop']),
+    ('obsidian', 10, ['Daily note - Vault - Obsidian', 'Physics/Thermodynamics - Vault - Obsidian']),
+    ('org.pwmt.zathura', 8, ['calculus_ch4.pdf', 'paper_draft.pdf', 'griffiths_qm.pdf']),
+    ('discord', 6, ['#study-group - Discord', 'Friends - Discord']),
+    ('spotify', 4, ['Spotify Premium']),
+    ('Desktop', 3, ['No window focused']),
+]
+TAGS = ['math', 'physics', 'cs', 'cs, projects', 'reading', 'math, exam', 'languages', 'writing']
+NAMES = ['Linear algebra', 'Problem set', 'Thesis', 'Side project', 'Lecture review',
+         'Exam prep', 'Reading', 'Flashcards', 'Lab report']
+
+
+def _pick_window(rng, weights):
+    app, _, titles = rng.choices(APPS, weights=weights)[0]
+    return app, rng.choice(titles)
+
+
+def _activity(rng, session_id, start_ts, end_ts, step, skip, weights):
+    """Yields 1/step Hz samples between start and end, switching focus in runs."""
+    app, title = _pick_window(rng, weights)
+    run_left = int(rng.expovariate(1 / 90)) + 1
+    ts = start_ts
+    while ts < end_ts:
+        if not (skip and skip[0] <= ts < skip[1]):
+            yield (session_id, int(ts), app, title)
+            run_left -= 1
+            if run_left <= 0:
+                app, title = _pick_window(rng, weights)
+                run_left = int(rng.expovariate(1 / 90)) + 1
+        ts += step
+
+
+def remove_db(db_path):
+    """Deletes a database together with its -wal/-shm files."""
+    db_path = Path(db_path)
+    for suffix in ('', '-wal', '-shm', '-journal'):
+        try:
+            Path(str(db_path) + suffix).unlink()
+        except FileNotFoundError:
+            pass
+
+
+def generate(db_path, years=1, seed=0, end_date=None, sample_hz=1.0):
+    """Creates (or replaces) db_path and fills it. Returns row counts."""
+    db_path = Path(db_path)
+    remove_db(db_path)
+    init_db(db_path)
+
+    rng = random.Random(seed)
+    weights = [w for _, w, _ in APPS]
+    step = 1.0 / sample_hz
+    end_date = end_date or datetime.date.today()
+    start_date = end_date - datetime.timedelta(days=int(365 * years) - 1)
+
+    conn = sqlite3.connect(db_path)
+    conn.execute('PRAGMA synchronous=OFF')
+    conn.execute('PRAGMA journal_mode=MEMORY')
+    c = conn.cursor()
+    counts = {'sessions': 0, 'breaks': 0, 'activity_log': 0}
+
+    day = start_date
+    while day <= end_date:
+        # Roughly one day off a week, otherwise 1-4 sessions
+        n_sessions = rng.choices([0, 1, 2, 3, 4], weights=[12, 30, 30, 18, 10])[0]
+        cursor_ts = int(datetime.datetime.combine(day, datetime.time(8, 0)).timestamp())
+        cursor_ts += rng.randint(0, 3 * 3600)
+        for _ in range(n_sessions):
+            length = rng.randint(25, 150) * 60
+            start_ts = cursor_ts
+            end_ts = start_ts + length
+            skip = None
+            break_time = 0
+            if rng.random() < 0.3:
+                pause = start_ts + rng.randint(length // 4, length // 2)
+                resume = pause + rng.randint(5, 15) * 60
+                skip = (pause, resume)
+                break_time = resume - pause
+                end_ts += break_time
+
+            c.execute('INSERT INTO sessions (name, tags, start_ts, end_ts, duration, target_duration) VALUES (?,?,?,?,?,?)',
+                      (rng.choice(NAMES), rng.choice(TAGS), start_ts, end_ts, end_ts - start_ts - break_time,
+                       rng.choice([0, 0, 0, 25 * 60, 50 * 60])))
+            sid = c.lastrowid
+            counts['sessions'] += 1
+            if skip:
+                c.execute('INSERT INTO breaks (session_id, pause_ts, resume_ts) VALUES (?,?,?)', (sid, skip[0], skip[1]))
+                counts['breaks'] += 1
+            c.executemany('INSERT INTO activity_log (session_id, timestamp, app_name, window_title) VALUES (?,?,?,?)',
+                          _activity(rng, sid, start_ts, end_ts, step, skip, weights))
+            counts['activity_log'] += c.rowcount
+            cursor_ts = end_ts + rng.randint(10, 120) * 60
+        day += datetime.timedelta(days=1)
+
+    daily.rebuild(c) # As init_db would on first start
+    conn.commit()
+    conn.close()
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('db_path')
+    parser.add_argument('--years', type=float, default=1)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--end-date', default=None, help='YYYY-MM-DD (default: today)')
+    parser.add_argument('--sample-hz', type=float, default=1.0)
+    args = parser.parse_args()
+
+    end_date = datetime.datetime.strptime(args.end_date, '%Y-%m-%d').date() if args.end_date else None
+    t0 = time.perf_counter()
+    counts = generate(args.db_path, args.years, args.seed, end_date, args.sample_hz)
+    print(f"Generated {args.db_path}: {counts} in {time.perf_counter() - t0:.1f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -3,49 +3,45 @@
 StudyTrack v1 - single-file CLI launcher that delegates to webapp package.
 
 Usage:
-  studytrack --start   # start detached server
-  studytrack --stop    # stop server
+  studytrack --start   # start detached server and tracker daemon
+  studytrack --stop    # stop server and tracker daemon
   studytrack --status  # show running status
+  studytrack --status --json  # machine-readable status incl. the live session
+  studytrack --start --asgi  # serve through the asyncio server (needs uvicorn)
 """
 import os
 import sys
 import argparse
 import time
 import signal
-from pathlib import Path
-from subprocess import Popen
-import sqlite3
 
-# Attempt to import Flask via webapp package. If imports fail, exit with helpful message.
-try:
-    # webapp package will import Flask
-    import webapp
-except Exception:
-    pass
+# Control commands (--status/--stop) run from status bars every few seconds, so
+# nothing heavy is imported at module level: Flask, psutil and the routes are
+# only imported by the --runserver/--runtracker paths.
+from webapp.config import DATA_DIR
 
 # Config
 PORT = 8080
-DATA_DIR = Path.home() / ".studytrack"
-DATA_DIR.mkdir(parents=True, exist_ok=True)
 PID_FILE = DATA_DIR / "studytrack.pid"
+TRACKER_PID_FILE = DATA_DIR / "tracker.pid"
 LOG_FILE = DATA_DIR / "studytrack.log"
 SCRIPT = os.path.abspath(__file__)
 
 # Helpers
-def write_pid(pid):
-    PID_FILE.write_text(str(pid))
+def write_pid(pid, pid_file=PID_FILE):
+    pid_file.write_text(str(pid))
 
-def read_pid():
-    if not PID_FILE.exists():
+def read_pid(pid_file=PID_FILE):
+    if not pid_file.exists():
         return None
     try:
-        return int(PID_FILE.read_text().strip())
+        return int(pid_file.read_text().strip())
     except Exception:
         return None
 
-def remove_pid():
+def remove_pid(pid_file=PID_FILE):
     try:
-        PID_FILE.unlink()
+        pid_file.unlink()
     except Exception:
         pass
 
@@ -67,55 +63,105 @@ def kill_group(pid):
         except Exception:
             return False
 
+def spawn(flags, pid_file):
+    """Launches this script detached with the given hidden flags and records its pid."""
+    from subprocess import Popen
+    DATA_DIR.mkdir(parents=True, exist_ok=True)
+    cmd = [sys.executable, SCRIPT] + flags
+    p = Popen(cmd, stdout=open(LOG_FILE, "a"), stderr=open(LOG_FILE, "a"), preexec_fn=os.setsid, close_fds=True)
+    write_pid(p.pid, pid_file)
+    return p.pid
+
 # CLI actions
-def start():
+def start(asgi=False):
+    # Tracker daemon first, so the server finds its socket on the first request
+    tracker_pid = read_pid(TRACKER_PID_FILE)
+    if tracker_pid and is_running(tracker_pid):
+        print(f"Tracker daemon already running (pid {tracker_pid})")
+    else:
+        try:
+            tracker_pid = spawn(["--runtracker"], TRACKER_PID_FILE)
+            print(f"Tracker daemon started (pid {tracker_pid})")
+        except Exception as e:
+            print("Failed to start tracker daemon:", e)
+
     pid = read_pid()
     if pid and is_running(pid):
         print(f"StudyTrack already running (pid {pid})")
         return
-    python = sys.executable
-    cmd = [python, SCRIPT, "--runserver"]
     try:
-        p = Popen(cmd, stdout=open(LOG_FILE, "a"), stderr=open(LOG_FILE, "a"), preexec_fn=os.setsid, close_fds=True)
-        write_pid(p.pid)
-        print(f"StudyTrack started on http://localhost:{PORT} (pid {p.pid})")
+        pid = spawn(["--runserver", "--asgi"] if asgi else ["--runserver"], PID_FILE)
+        print(f"StudyTrack started on http://localhost:{PORT} (pid {pid})")
         print("You can close this terminal. To stop: studytrack --stop")
     except Exception as e:
         print("Failed to start StudyTrack:", e)
 
-def stop():
-    pid = read_pid()
+def stop_process(name, pid_file):
+    pid = read_pid(pid_file)
     if not pid:
-        print("StudyTrack is not running (no pid file).")
+        print(f"{name} is not running (no pid file).")
         return
     if not is_running(pid):
-        print("Stale pid file found; removing.")
-        remove_pid()
+        print(f"Stale {name} pid file found; removing.")
+        remove_pid(pid_file)
         return
     ok = kill_group(pid)
     if ok:
         time.sleep(0.3)
-        remove_pid()
-        print("StudyTrack stopped.")
+        remove_pid(pid_file)
+        print(f"{name} stopped.")
     else:
-        print("Failed to stop StudyTrack. Try: sudo pkill -f studytrack.py")
+        print(f"Failed to stop {name}. Try: sudo pkill -f studytrack.py")
+
+def stop():
+    stop_process("StudyTrack", PID_FILE)
+    stop_process("Tracker daemon", TRACKER_PID_FILE)
 
 def status():
     pid = read_pid()
     if not pid:
         print("StudyTrack is not running.")
-        return
-    if is_running(pid):
+    elif is_running(pid):
         print(f"StudyTrack running (pid {pid}) at http://localhost:{PORT}")
     else:
         print("PID exists but process not running. Remove pid file and try again.")
 
+    tracker_pid = read_pid(TRACKER_PID_FILE)
+    if tracker_pid and is_running(tracker_pid):
+        print(f"Tracker daemon running (pid {tracker_pid})")
+    else:
+        print("Tracker daemon is not running.")
+
+def status_json():
+    """Prints pids plus the live session state, asked from the tracker daemon's socket."""
+    import json
+    pid = read_pid()
+    tracker_pid = read_pid(TRACKER_PID_FILE)
+    out = {
+        'server': {'running': bool(pid and is_running(pid)), 'pid': pid, 'url': f"http://localhost:{PORT}"},
+        'tracker': {'running': bool(tracker_pid and is_running(tracker_pid)), 'pid': tracker_pid, 'tracking': False},
+        'live': None
+    }
+    try:
+        from webapp.control import send_command
+        reply = send_command('session', timeout=1.0)
+        out['tracker']['tracking'] = reply.get('tracking', False)
+        out['live'] = reply.get('live')
+    except (OSError, ValueError) as e:
+        out['error'] = f"tracker daemon not reachable: {e}"
+    print(json.dumps(out))
+
 # When launched as runserver, import and run webapp.app
-def runserver():
+def runserver(asgi=False):
     # import local webapp package and start app
     # keep import here so venv activation is required earlier
+    if asgi:
+        run_asgi()
+        return
     try:
+        from webapp.logutil import setup_logging
         from webapp.routes import create_app
+        setup_logging()
         app = create_app()
         # FORCE DEBUG MODE
         app.run(host='127.0.0.1', port=PORT, threaded=True, debug=True, use_reloader=False)
@@ -125,26 +171,109 @@ def runserver():
     except Exception as e:
         print(f"An error occurred: {e}")
 
+# Asyncio variant: same routes, DB work on a bounded pool, SSE status stream on one loop
+def run_asgi():
+    try:
+        import uvicorn
+    except ImportError:
+        print("Error: --asgi requires uvicorn. Install it with: pip install uvicorn")
+        return
+    try:
+        from webapp.asgi import create_asgi_app
+        from webapp.logutil import setup_logging
+        setup_logging()
+        uvicorn.run(create_asgi_app(), host='127.0.0.1', port=PORT, log_level='info')
+    except ImportError as e:
+        print(f"Error: Failed to import webapp. {e}")
+        print("Please ensure your venv is active and all files are saved.")
+    except Exception as e:
+        print(f"An error occurred: {e}")
+
+# When launched as runtracker, run the tracker daemon in the foreground
+def runtracker():
+    try:
+        from webapp.daemon import serve
+        from webapp.logutil import setup_logging
+        setup_logging()
+        serve()
+    except ImportError as e:
+        print(f"Error: Failed to import webapp. {e}")
+        print("Please ensure your venv is active and all files are saved.")
+    except Exception as e:
+        print(f"An error occurred: {e}")
+
+# Pull sessions from another machine's database into this one
+def merge(source):
+    try:
+        from webapp.routes import init_db
+        from webapp.sync import merge as merge_db, MergeError
+    except ImportError as e:
+        print(f"Error: Failed to import webapp. {e}")
+        print("Please ensure your venv is active and all files are saved.")
+        sys.exit(1)
+    init_db()
+    try:
+        stats = merge_db(source)
+    except MergeError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    print(f"Merged {source} (host {stats['source_host'][:8]}) in {stats['seconds']}s: "
+          f"{stats['added']} added, {stats['updated']} updated, {stats['unchanged']} unchanged, "
+          f"{stats['deleted']} deleted, {stats['activity_rows']} activity rows")
+
+# Online backup of the database; safe while the server and tracker run
+def backup(compress=False):
+    try:
+        from webapp.backup import run_backup
+        from webapp.config import DB_FILE
+    except ImportError as e:
+        print(f"Error: Failed to import webapp. {e}")
+        print("Please ensure your venv is active and all files are saved.")
+        sys.exit(1)
+    if not DB_FILE.exists():
+        print(f"Error: {DB_FILE} does not exist")
+        sys.exit(1)
+    result = run_backup(compress=compress)
+    print(f"Backup written to {result['path']} ({result['bytes'] / 1e6:.1f} MB): "
+          f"{result['pages']} pages in {result['steps']} steps, {result['seconds']}s")
+    if result['rotated']:
+        print(f"Removed old backups: {', '.join(result['rotated'])}")
+
 # Argparse
 def main():
     parser = argparse.ArgumentParser(prog='studytrack')
     parser.add_argument('--start', action='store_true')
     parser.add_argument('--stop', action='store_true')
     parser.add_argument('--status', action='store_true')
+    parser.add_argument('--json', action='store_true', help='with --status: print JSON')
+    parser.add_argument('--asgi', action='store_true', help='serve with the asyncio (ASGI) server')
+    parser.add_argument('--merge', metavar='OTHER_DB', help="merge another machine's studytrack.db into this one")
+    parser.add_argument('--backup', action='store_true', help='write a snapshot to ~/.studytrack/backups/')
+    parser.add_argument('--compress', action='store_true', help='with --backup: gzip the snapshot')
     parser.add_argument('--runserver', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--runtracker', action='store_true', help=argparse.SUPPRESS)
     args = parser.parse_args()
 
     if args.runserver:
-        runserver()
+        runserver(asgi=args.asgi)
+        return
+    if args.runtracker:
+        runtracker()
         return
     if args.start:
-        start()
+        start(asgi=args.asgi)
         return
     if args.stop:
         stop()
         return
     if args.status:
-        status()
+        status_json() if args.json else status()
+        return
+    if args.merge:
+        merge(args.merge)
+        return
+    if args.backup:
+        backup(compress=args.compress)
         return
     parser.print_help()
 
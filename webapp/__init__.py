@@ -1,3 +1,10 @@
 # webapp package initializer
+#
+# create_app is imported lazily so that light modules (config, control) can be
+# used by the CLI without pulling in Flask, psutil and the routes.
 
-from .routes import create_app
+def __getattr__(name):
+    if name == 'create_app':
+        from .routes import create_app
+        return create_app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,187 @@
+"""
+Asyncio (ASGI) serving option.
+
+Runs the existing Flask app behind a single event loop:
+  * Regular requests (pages and /api/*) are handed to the Flask WSGI app on a
+    bounded thread pool, so the JSON contract is exactly the same as the
+    threaded server and DB work never blocks the loop.
+  * GET /api/status/stream is served natively on the loop as Server-Sent
+    Events. One broadcaster computes /api/status once per tick and fans the
+    result out to every subscriber, so an idle subscriber costs one pending
+    receive() and no thread.
+
+Run with: studytrack --runserver --asgi   (requires uvicorn)
+"""
+import io
+import sys
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from .routes import create_app
+
+MAX_WORKERS = 8
+STATUS_INTERVAL = 1.0
+
+log = logging.getLogger('studytrack.asgi')
+
+
+class StudyTrackASGI:
+    def __init__(self, flask_app=None, max_workers=MAX_WORKERS, status_interval=STATUS_INTERVAL):
+        self.flask_app = flask_app or create_app()
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='studytrack-db')
+        self.status_interval = status_interval
+        self.subscribers = 0
+        self._latest = None       # Last /api/status body sent to subscribers
+        self._next = None         # Future resolved with the next status body
+        self._broadcaster = None
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+            return
+        if scope['type'] != 'http':
+            return
+        if scope['path'] == '/api/status/stream' and scope['method'] == 'GET':
+            await self._stream_status(receive, send)
+            return
+        await self._proxy_wsgi(scope, receive, send)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.executor.shutdown(wait=False)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    # --- WSGI bridge ---
+    async def _proxy_wsgi(self, scope, receive, send):
+        body = b''
+        more_body = True
+        while more_body:
+            message = await receive()
+            body += message.get('body', b'')
+            more_body = message.get('more_body', False)
+
+        loop = asyncio.get_running_loop()
+        status, headers, chunks = await loop.run_in_executor(
+            self.executor, self._call_wsgi, build_environ(scope, body)
+        )
+        await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+        await send({'type': 'http.response.body', 'body': b''.join(chunks)})
+
+    def _call_wsgi(self, environ):
+        """Runs one request through the Flask app. Called on the thread pool."""
+        response = {}
+
+        def start_response(status, headers, exc_info=None):
+            response['status'] = int(status.split(' ', 1)[0])
+            response['headers'] = [(k.lower().encode('latin-1'), v.encode('latin-1')) for k, v in headers]
+
+        result = self.flask_app(environ, start_response)
+        try:
+            chunks = list(result)
+        finally:
+            if hasattr(result, 'close'):
+                result.close()
+        return response['status'], response['headers'], chunks
+
+    # --- Status stream (SSE) ---
+    def _fetch_status(self):
+        environ = build_environ({'method': 'GET', 'path': '/api/status', 'query_string': b'', 'headers': []}, b'')
+        status, headers, chunks = self._call_wsgi(environ)
+        return b''.join(chunks).strip()
+
+    async def _broadcast(self):
+        loop = asyncio.get_running_loop()
+        try:
+            while self.subscribers > 0:
+                try:
+                    body = await loop.run_in_executor(self.executor, self._fetch_status)
+                except Exception as e:
+                    log.warning("Status broadcast error: %s", e)
+                    body = None
+                if body is not None:
+                    self._latest = body
+                    current, self._next = self._next, loop.create_future()
+                    current.set_result(body)
+                await asyncio.sleep(self.status_interval)
+        finally:
+            self._broadcaster = None
+            self._latest = None
+
+    async def _stream_status(self, receive, send):
+        loop = asyncio.get_running_loop()
+        if self._next is None:
+            self._next = loop.create_future()
+        self.subscribers += 1
+        if self._broadcaster is None:
+            self._broadcaster = asyncio.ensure_future(self._broadcast())
+
+        disconnected = asyncio.ensure_future(wait_for_disconnect(receive))
+        try:
+            await send({
+                'type': 'http.response.start', 'status': 200,
+                'headers': [(b'content-type', b'text/event-stream'), (b'cache-control', b'no-cache')]
+            })
+            if self._latest is not None:
+                await send({'type': 'http.response.body', 'body': sse_event(self._latest), 'more_body': True})
+            while True:
+                tick = self._next
+                await asyncio.wait({tick, disconnected}, return_when=asyncio.FIRST_COMPLETED)
+                if disconnected.done():
+                    break
+                await send({'type': 'http.response.body', 'body': sse_event(tick.result()), 'more_body': True})
+        finally:
+            self.subscribers -= 1
+            if not disconnected.done():
+                disconnected.cancel()
+
+
+# --- HELPERS ---
+async def wait_for_disconnect(receive):
+    while (await receive())['type'] != 'http.disconnect':
+        pass
+
+
+def sse_event(data):
+    return b'data: ' + data + b'\n\n'
+
+
+def build_environ(scope, body):
+    """Builds a WSGI environ dict from an ASGI HTTP scope."""
+    server = scope.get('server') or ('127.0.0.1', 8080)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+        'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope['query_string'].decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'REMOTE_ADDR': (scope.get('client') or ('127.0.0.1', 0))[0],
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False,
+        'CONTENT_LENGTH': str(len(body)),
+    }
+    for name, value in scope.get('headers', []):
+        name = name.decode('latin-1').upper().replace('-', '_')
+        value = value.decode('latin-1')
+        if name == 'CONTENT_TYPE':
+            environ['CONTENT_TYPE'] = value
+        elif name != 'CONTENT_LENGTH':
+            key = f'HTTP_{name}'
+            environ[key] = f"{environ[key]},{value}" if key in environ else value
+    return environ
+
+
+def create_asgi_app(**kwargs):
+    return StudyTrackASGI(**kwargs)
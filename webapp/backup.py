@@ -0,0 +1,224 @@
+"""
+Online backups of studytrack.db.
+
+Copying the database file while the server runs can produce a torn copy.
+run_backup() instead uses SQLite's online backup API, PAGES_PER_STEP pages
+at a time with a short pause between steps, so the disk is never saturated.
+
+The database runs in WAL mode and the backup holds one read transaction for
+its whole duration. The snapshot is therefore consistent as of the moment
+the backup started, the copy never has to restart when the tracker commits,
+and writers (tracker, requests) are not blocked at all.
+
+Snapshots are written as a temporary file and renamed into place, switched
+back to a self-contained rollback-journal file (no -wal/-shm needed, e.g.
+for `studytrack --merge` on another machine), optionally gzipped, and only
+the newest BACKUP_KEEP are kept.
+
+BackupWorker runs backups in the background for the API and, when
+BACKUP_INTERVAL_HOURS is set, on a schedule.
+"""
+import os
+import gzip
+import time
+import shutil
+import sqlite3
+import logging
+import datetime
+import threading
+from pathlib import Path
+
+from . import metrics
+from .config import DB_FILE, BACKUP_DIR, BACKUP_KEEP, BACKUP_INTERVAL_HOURS, BACKUP_COMPRESS
+from .db import connect
+
+PAGES_PER_STEP = 256    # 1 MiB per step with 4 KiB pages
+STEP_PAUSE = 0.002      # seconds between steps
+PREFIX = 'studytrack-'
+
+log = logging.getLogger('studytrack.backup')
+
+BACKUPS = metrics.Counter('studytrack_backups_total', 'Backups taken', ('result',))
+
+_worker = None
+_worker_lock = threading.Lock()
+
+
+def list_backups(dest_dir=BACKUP_DIR):
+    """Snapshots in dest_dir, newest first."""
+    dest_dir = Path(dest_dir)
+    if not dest_dir.is_dir():
+        return []
+    files = [p for p in dest_dir.iterdir()
+             if p.name.startswith(PREFIX) and (p.name.endswith('.db') or p.name.endswith('.db.gz'))]
+    files.sort(key=lambda p: p.name, reverse=True) # Names sort by time
+    return [{'name': p.name, 'bytes': p.stat().st_size, 'mtime': int(p.stat().st_mtime)} for p in files]
+
+
+def rotate(dest_dir=BACKUP_DIR, keep=BACKUP_KEEP):
+    """Deletes all but the newest `keep` snapshots. Returns the removed names."""
+    removed = []
+    for snap in list_backups(dest_dir)[keep:]:
+        os.remove(Path(dest_dir) / snap['name'])
+        removed.append(snap['name'])
+    return removed
+
+
+def run_backup(db_file=DB_FILE, dest_dir=BACKUP_DIR, keep=BACKUP_KEEP, compress=BACKUP_COMPRESS,
+               pages=PAGES_PER_STEP, pause=STEP_PAUSE, progress=None):
+    """
+    Writes one snapshot of db_file into dest_dir and rotates old ones.
+    `progress(copied, total)` is called after every step.
+    Returns a dict with the path, size, pages copied, steps and duration.
+    """
+    dest_dir = Path(dest_dir)
+    dest_dir.mkdir(parents=True, exist_ok=True)
+    stamp = datetime.datetime.now().strftime('%Y%m%d-%H%M%S')
+    final = dest_dir / f"{PREFIX}{stamp}.db{'.gz' if compress else ''}"
+    tmp = dest_dir / f".{PREFIX}{stamp}.db.tmp"
+
+    t0 = time.perf_counter()
+    steps = 0
+    total_pages = 0
+
+    def _step(status, remaining, total):
+        nonlocal steps, total_pages
+        steps += 1
+        total_pages = total
+        if progress:
+            progress(total - remaining, total)
+        if remaining and pause:
+            time.sleep(pause)
+
+    try:
+        src = connect(db_file, isolation_level=None)
+        dst = sqlite3.connect(tmp)
+        try:
+            # One read transaction across all steps: a fixed snapshot, and
+            # commits by other connections don't restart the copy
+            src.execute("BEGIN")
+            src.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()
+            src.backup(dst, pages=pages, progress=_step)
+            src.execute("COMMIT")
+            dst.execute("PRAGMA journal_mode=DELETE") # Self-contained file
+        finally:
+            dst.close()
+            src.close()
+
+        if compress:
+            gz_tmp = tmp.with_suffix('.gz.tmp')
+            with open(tmp, 'rb') as f_in, gzip.open(gz_tmp, 'wb', compresslevel=6) as f_out:
+                shutil.copyfileobj(f_in, f_out, 1024 * 1024)
+            os.remove(tmp)
+            tmp = gz_tmp
+        os.replace(tmp, final)
+    except Exception:
+        BACKUPS.inc(result='error')
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+
+    removed = rotate(dest_dir, keep)
+    BACKUPS.inc(result='ok')
+    result = {
+        'path': str(final),
+        'bytes': final.stat().st_size,
+        'pages': total_pages,
+        'steps': steps,
+        'seconds': round(time.perf_counter() - t0, 3),
+        'compressed': compress,
+        'rotated': removed
+    }
+    log.info("Backup %s: %s pages in %ss", final.name, total_pages, result['seconds'])
+    return result
+
+
+class BackupWorker(threading.Thread):
+    """Takes backups on request and, if `interval` (seconds) is set, on a schedule."""
+    def __init__(self, db_file, dest_dir=BACKUP_DIR, interval=None):
+        super().__init__(daemon=True, name='studytrack-backup')
+        self.db_file = db_file
+        self.dest_dir = dest_dir
+        self.interval = interval
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+        self._requested = None # compress flag of a pending on-demand backup
+        self.running = False
+        self.progress = None
+        self.last = None
+        self.error = None
+
+    def request(self, compress=BACKUP_COMPRESS):
+        """Queues an on-demand backup. Returns False if one is already running or queued."""
+        with self._lock:
+            if self.running or self._requested is not None:
+                return False
+            self._requested = compress
+        self._wake.set()
+        return True
+
+    def status(self):
+        with self._lock:
+            return {
+                'running': self.running,
+                'queued': self._requested is not None and not self.running,
+                'progress': self.progress,
+                'last': self.last,
+                'error': self.error,
+                'interval_hours': self.interval / 3600 if self.interval else None,
+                'backups': list_backups(self.dest_dir)
+            }
+
+    def _due(self):
+        if not self.interval:
+            return False
+        snaps = list_backups(self.dest_dir)
+        # Based on the newest snapshot, so restarts don't cause extra backups
+        return not snaps or time.time() - snaps[0]['mtime'] >= self.interval
+
+    def run(self):
+        while True:
+            with self._lock:
+                compress = self._requested
+            if compress is not None or self._due():
+                self._backup(BACKUP_COMPRESS if compress is None else compress)
+            self._wake.wait(min(self.interval, 600.0) if self.interval else None)
+            self._wake.clear()
+
+    def _backup(self, compress):
+        with self._lock:
+            self.running = True
+            self.progress = 0.0
+            self.error = None
+
+        def _progress(copied, total):
+            self.progress = round(copied / total, 3) if total else 1.0
+
+        try:
+            result = run_backup(self.db_file, self.dest_dir, compress=compress, progress=_progress)
+        except Exception as e:
+            log.error("Backup failed: %s", e)
+            result = None
+            error = str(e)
+        else:
+            error = None
+        with self._lock:
+            self.running = False
+            self._requested = None
+            self.progress = None
+            self.error = error
+            if result:
+                self.last = dict(result, finished_ts=int(time.time()))
+
+
+def start_worker(db_file, interval_hours=BACKUP_INTERVAL_HOURS):
+    """Starts the process-wide backup worker once."""
+    global _worker
+    with _worker_lock:
+        if _worker is None or not _worker.is_alive():
+            interval = interval_hours * 3600 if interval_hours else None
+            _worker = BackupWorker(db_file, interval=interval)
+            _worker.start()
+    return _worker
@@ -0,0 +1,59 @@
+"""
+Response compression for /api/* JSON.
+
+An after_request hook compresses JSON responses from /api/* with the best
+encoding the client accepts: Brotli if the optional `brotli` module is
+installed, otherwise gzip. Small bodies, streamed responses and responses
+that already carry a Content-Encoding are left alone.
+"""
+import gzip
+
+try:
+    import brotli
+except ImportError: # Optional: pip install brotli
+    brotli = None
+
+from . import metrics
+
+MIN_SIZE = 512          # bytes; smaller bodies aren't worth compressing
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+COMPRESSED_BYTES = metrics.Counter('studytrack_http_compressed_bytes_total', 'Response bytes before and after compression',
+                                   ('encoding', 'stage'))
+
+
+def _encodings():
+    return ['br', 'gzip'] if brotli is not None else ['gzip']
+
+
+def compress(body, encoding):
+    if encoding == 'br':
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def init_app(app, prefix='/api/'):
+    from flask import request
+
+    @app.after_request
+    def _compress(response):
+        if (not request.path.startswith(prefix)
+                or response.mimetype != 'application/json'
+                or response.direct_passthrough
+                or response.is_streamed
+                or 'Content-Encoding' in response.headers):
+            return response
+        response.vary.add('Accept-Encoding')
+        encoding = request.accept_encodings.best_match(_encodings())
+        if encoding is None:
+            return response
+        body = response.get_data()
+        if len(body) < MIN_SIZE:
+            return response
+        compressed = compress(body, encoding)
+        response.set_data(compressed) # Also updates Content-Length
+        response.headers['Content-Encoding'] = encoding
+        COMPRESSED_BYTES.inc(len(body), encoding=encoding, stage='in')
+        COMPRESSED_BYTES.inc(len(compressed), encoding=encoding, stage='out')
+        return response
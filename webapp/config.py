@@ -0,0 +1,35 @@
+# Shared paths and settings used by the web server, the tracker daemon and the CLI.
+import os
+from pathlib import Path
+
+DATA_DIR = Path.home() / ".studytrack"
+DB_FILE = DATA_DIR / "studytrack.db"
+
+# Unix socket the tracker daemon listens on
+TRACKER_SOCKET = DATA_DIR / "tracker.sock"
+
+# --- Profiling (see profiling.py) ---
+# 'off': no hooks at all, 'request': only requests flagged with the
+# X-StudyTrack-Profile header or ?_profile=1, 'all': every request
+PROFILE_MODE = os.environ.get('STUDYTRACK_PROFILE', 'request').lower()
+PROFILES_DIR = DATA_DIR / "profiles"
+
+# Statements slower than this (ms) are written to the slow-query log. Unset disables it.
+SLOW_QUERY_MS = float(os.environ['STUDYTRACK_SLOW_QUERY_MS']) if os.environ.get('STUDYTRACK_SLOW_QUERY_MS') else None
+SLOW_QUERY_LOG = DATA_DIR / "slow_queries.log"
+
+# --- Idle detection (see idle.py) ---
+# An idle daemon (e.g. a hypridle listener) creates this file while the user is idle
+IDLE_STATE_FILE = DATA_DIR / "idle"
+# Also treat unchanged input interrupt counters in /proc/interrupts as idle
+IDLE_INPUT_IRQ = os.environ.get('STUDYTRACK_IDLE_INPUT_IRQ', '0') == '1'
+
+# Tracker samples are appended here first and replayed into the DB (see journal.py)
+JOURNAL_FILE = DATA_DIR / "tracker.journal"
+
+# --- Backups (see backup.py) ---
+BACKUP_DIR = Path(os.environ['STUDYTRACK_BACKUP_DIR']).expanduser() if os.environ.get('STUDYTRACK_BACKUP_DIR') else DATA_DIR / "backups"
+BACKUP_KEEP = int(os.environ.get('STUDYTRACK_BACKUP_KEEP', 7))
+# Hours between scheduled backups taken by the web server. Unset disables the schedule.
+BACKUP_INTERVAL_HOURS = float(os.environ['STUDYTRACK_BACKUP_INTERVAL_HOURS']) if os.environ.get('STUDYTRACK_BACKUP_INTERVAL_HOURS') else None
+BACKUP_COMPRESS = os.environ.get('STUDYTRACK_BACKUP_COMPRESS', '0') == '1'
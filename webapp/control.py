@@ -0,0 +1,41 @@
+"""
+Client side of the tracker daemon's control socket.
+
+Kept free of heavy imports (no Flask, psutil or sqlite3) so that
+`studytrack --status --json` can use it cheaply.
+"""
+import json
+import socket
+
+from .config import TRACKER_SOCKET
+
+SOCKET_TIMEOUT = 2.0
+# Commands that stop a tracker (stop, pause, and start/resume replacing the
+# current one) wait for it to write its idle break (5 s busy timeout) and its
+# final journal drain (tracker.FINAL_DRAIN_TIMEOUT), so the caller sees every
+# row before it computes the session's duration
+STOP_TIMEOUT = 15.0
+STOPPING_COMMANDS = ('start', 'resume', 'pause', 'stop')
+
+# What connecting raises when no daemon is listening (no socket, or a stale
+# one). Anything else, e.g. socket.timeout, means the daemon is there but
+# didn't answer in time.
+NO_DAEMON_ERRORS = (FileNotFoundError, ConnectionRefusedError)
+
+
+def send_command(cmd, session_id=None, socket_path=TRACKER_SOCKET, timeout=SOCKET_TIMEOUT):
+    """
+    Sends one command to the daemon and returns its reply.
+    Raises one of NO_DAEMON_ERRORS if no daemon is listening, and another
+    OSError if it is unreachable or too slow to reply.
+    """
+    payload = json.dumps({'cmd': cmd, 'session_id': session_id}) + '\n'
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as s:
+        s.settimeout(timeout)
+        s.connect(str(socket_path))
+        s.sendall(payload.encode('utf-8'))
+        with s.makefile('r', encoding='utf-8') as f:
+            line = f.readline()
+    if not line:
+        raise ConnectionError("tracker daemon closed the connection")
+    return json.loads(line)
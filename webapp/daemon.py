@@ -0,0 +1,150 @@
+"""
+Standalone tracker daemon.
+
+Runs the ActivityTracker outside of the web server so that sampling does not
+share a process (or the GIL) with request handling, and keeps tracking alive
+while the web server restarts.
+
+The daemon is controlled over a local Unix socket. Each request is a single
+line of JSON and gets a single line of JSON back:
+
+  {"cmd": "start",  "session_id": 12}
+  {"cmd": "pause",  "session_id": 12}
+  {"cmd": "resume", "session_id": 12}
+  {"cmd": "stop",   "session_id": 12}   # session_id optional: stops anything
+  {"cmd": "status"}
+  {"cmd": "metrics"}                    # metrics.snapshot() of the daemon
+  {"cmd": "session"}                    # status plus the live /api/status payload
+
+The client side lives in control.py.
+"""
+import os
+import json
+import signal
+import logging
+import threading
+import socketserver
+from pathlib import Path
+
+from . import journal, metrics
+from .config import DB_FILE, TRACKER_SOCKET
+from .db import connect
+from .sessions import get_live_status
+from .tracker import ActivityTracker
+
+log = logging.getLogger('studytrack.daemon')
+
+
+class TrackerController:
+    """
+    Owns at most one ActivityTracker and applies control commands to it.
+    Used by the daemon, and in-process by the web server when no daemon is running.
+    """
+    def __init__(self, db_file):
+        self.db_file = db_file
+        self.tracker = None
+        self._lock = threading.Lock()
+
+    def _is_active(self):
+        return self.tracker is not None and self.tracker.is_alive()
+
+    def _stop_current(self):
+        if self._is_active():
+            self.tracker.stop()
+            self.tracker.join()
+        self.tracker = None
+
+    def _start_new(self, session_id):
+        self._stop_current()
+        self.tracker = ActivityTracker(session_id=session_id, db_file=self.db_file)
+        self.tracker.start()
+
+    def _owns(self, session_id):
+        return session_id is None or (self._is_active() and self.tracker.session_id == session_id)
+
+    def handle(self, cmd, session_id=None):
+        """Applies a single command and returns the resulting status dict."""
+        with self._lock:
+            if cmd in ('start', 'resume'):
+                if session_id is None:
+                    return {'success': False, 'error': 'no session_id'}
+                self._start_new(session_id)
+            elif cmd in ('pause', 'stop'):
+                if self._owns(session_id):
+                    self._stop_current()
+            elif cmd == 'metrics':
+                return {'success': True, 'metrics': metrics.snapshot()}
+            elif cmd == 'session':
+                return dict(self._status(), live=self._live_status())
+            elif cmd != 'status':
+                return {'success': False, 'error': f'unknown command: {cmd}'}
+            return self._status()
+
+    def _status(self):
+        active = self._is_active()
+        return {
+            'success': True,
+            'tracking': active,
+            'session_id': self.tracker.session_id if active else None,
+            'pid': os.getpid()
+        }
+
+    def _live_status(self):
+        conn = connect(self.db_file)
+        try:
+            return get_live_status(conn)
+        finally:
+            conn.close()
+
+    def shutdown(self):
+        with self._lock:
+            self._stop_current()
+
+
+# --- Server ---
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            try:
+                req = json.loads(line)
+                reply = self.server.controller.handle(req.get('cmd'), req.get('session_id'))
+            except Exception as e:
+                reply = {'success': False, 'error': str(e)}
+            self.wfile.write((json.dumps(reply) + '\n').encode('utf-8'))
+
+
+class _Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def serve(socket_path=TRACKER_SOCKET, db_file=DB_FILE):
+    """Runs the daemon in the foreground until SIGTERM/SIGINT."""
+    Path(socket_path).parent.mkdir(parents=True, exist_ok=True)
+    socket_path = str(socket_path)
+    try:
+        os.unlink(socket_path) # Stale socket from a previous run
+    except FileNotFoundError:
+        pass
+
+    server = _Server(socket_path, _Handler)
+    os.chmod(socket_path, 0o600)
+    server.controller = TrackerController(db_file)
+    journal.recover(db_file)
+
+    def _on_signal(signum, frame):
+        raise SystemExit(0)
+    signal.signal(signal.SIGTERM, _on_signal)
+
+    log.info("Listening on %s (pid %s)", socket_path, os.getpid())
+    try:
+        server.serve_forever()
+    except (SystemExit, KeyboardInterrupt):
+        pass
+    finally:
+        server.controller.shutdown()
+        server.server_close()
+        try:
+            os.unlink(socket_path)
+        except FileNotFoundError:
+            pass
+        log.info("Stopped")
@@ -0,0 +1,242 @@
+"""
+Persistent per-day index of focus time.
+
+daily_stats has one row per local calendar day (as days since 1970-01-01)
+with the focus seconds, the number of sessions started that day, the tag
+with the most focus time and `streak`, the number of consecutive active
+days ending on that day. daily_tags holds the focus seconds per day and tag.
+
+A session's focus time is its [start_ts, end_ts] span minus its breaks,
+split at local midnight, so a session from 23:00 to 01:00 counts one hour
+on each day. Only finished, non-deleted sessions are indexed.
+
+The index is maintained incrementally: whenever sessions are stopped,
+deleted or merged, refresh_sessions() recomputes just the days they touch
+(from every session overlapping those days, so it is idempotent) and
+re-chains the streaks after them. The heatmap for a year and the current
+and longest streak are then primary-key or index lookups, independent of
+the size of the history.
+"""
+import datetime
+from collections import defaultdict
+
+EPOCH_DATE = datetime.date(1970, 1, 1)
+
+
+def init_tables(c):
+    c.execute('''
+    CREATE TABLE IF NOT EXISTS daily_stats (
+        day INTEGER PRIMARY KEY,
+        focus_seconds INTEGER DEFAULT 0,
+        sessions INTEGER DEFAULT 0,
+        top_tag TEXT,
+        streak INTEGER DEFAULT 0
+    )
+    ''')
+    c.execute('''
+    CREATE TABLE IF NOT EXISTS daily_tags (
+        day INTEGER,
+        tag TEXT,
+        seconds INTEGER,
+        PRIMARY KEY (day, tag)
+    )
+    ''')
+    c.execute("CREATE INDEX IF NOT EXISTS idx_daily_streak ON daily_stats (streak, day)")
+    # Sessions overlapping a day range are looked up by start_ts
+    c.execute("CREATE INDEX IF NOT EXISTS idx_sessions_start ON sessions (start_ts)")
+
+
+# --- Day arithmetic (local time) ---
+def day_of(ts):
+    return (datetime.date.fromtimestamp(ts) - EPOCH_DATE).days
+
+
+def day_start(day):
+    return int(datetime.datetime.combine(EPOCH_DATE + datetime.timedelta(days=day), datetime.time.min).timestamp())
+
+
+def split_by_day(start_ts, end_ts, breaks):
+    """
+    Focus seconds per day for a session: [start_ts, end_ts] minus the
+    (pause_ts, resume_ts) breaks, split at local midnight. Returns {day: seconds}.
+    """
+    # Focus intervals: the session span with the (clipped, merged) breaks cut out
+    intervals = []
+    cursor = start_ts
+    for pause, resume in sorted((max(p, start_ts), min(r, end_ts)) for p, r in breaks if r is not None):
+        if resume <= cursor or pause >= resume: # Already covered, or outside the session
+            continue
+        if pause > cursor:
+            intervals.append((cursor, pause))
+        cursor = max(cursor, resume)
+    if cursor < end_ts:
+        intervals.append((cursor, end_ts))
+
+    seconds = defaultdict(int)
+    for a, b in intervals:
+        day = day_of(a)
+        while a < b:
+            midnight = day_start(day + 1)
+            chunk_end = min(b, midnight)
+            seconds[day] += chunk_end - a
+            a = chunk_end
+            day += 1
+    return seconds
+
+
+def session_days(c, session_ids):
+    """Days spanned by the given finished sessions, deleted or not."""
+    days = set()
+    ids = list(session_ids)
+    for i in range(0, len(ids), 500):
+        chunk = ids[i:i + 500]
+        placeholders = ','.join('?' for _ in chunk)
+        c.execute(f"SELECT start_ts, end_ts FROM sessions WHERE id IN ({placeholders}) AND end_ts > 0", chunk)
+        for start_ts, end_ts in c.fetchall():
+            days.update(range(day_of(start_ts), day_of(end_ts) + 1))
+    return days
+
+
+def _runs(days):
+    """Splits days into runs of consecutive days."""
+    run = []
+    for day in sorted(days):
+        if run and day != run[-1] + 1:
+            yield run
+            run = []
+        run.append(day)
+    if run:
+        yield run
+
+
+def refresh_days(c, days):
+    """Recomputes the given days from all sessions overlapping them, then fixes the streaks."""
+    for run in _runs(set(days)):
+        _refresh_run(c, run[0], run[-1])
+
+
+def _longest_session(c):
+    """Longest span of any finished, non-deleted session, in seconds."""
+    c.execute("SELECT MAX(end_ts - start_ts) FROM sessions WHERE deleted = 0 AND end_ts > 0")
+    return max(0, c.fetchone()[0] or 0)
+
+
+def _refresh_run(c, first, last):
+    span_start, span_end = day_start(first), day_start(last + 1)
+    focus = defaultdict(int)
+    started = defaultdict(int)
+    tags = defaultdict(lambda: defaultdict(int))
+
+    # A lower bound on start_ts keeps idx_sessions_start usable. It comes from
+    # the longest indexed session, so sessions of any length (one left running
+    # for days, or merged in) still overlap correctly.
+    c.execute('''SELECT id, tags, start_ts, end_ts FROM sessions
+                 WHERE deleted = 0 AND end_ts > 0 AND start_ts < ? AND end_ts > ? AND start_ts >= ?''',
+              (span_end, span_start, span_start - _longest_session(c)))
+    for sid, tag_str, start_ts, end_ts in c.fetchall():
+        c.execute("SELECT pause_ts, resume_ts FROM breaks WHERE session_id = ?", (sid,))
+        per_day = split_by_day(start_ts, end_ts, c.fetchall())
+        session_tags = [t.strip() for t in (tag_str or '').split(',') if t.strip()]
+        if first <= day_of(start_ts) <= last:
+            started[day_of(start_ts)] += 1
+        for day, secs in per_day.items():
+            if first <= day <= last:
+                focus[day] += secs
+                for tag in session_tags:
+                    tags[day][tag] += secs
+
+    c.execute("DELETE FROM daily_tags WHERE day BETWEEN ? AND ?", (first, last))
+    c.execute("DELETE FROM daily_stats WHERE day BETWEEN ? AND ?", (first, last))
+    rows = []
+    for day in sorted(set(focus) | set(started)):
+        day_tags = tags[day]
+        top_tag = max(day_tags.items(), key=lambda item: item[1])[0] if day_tags else None
+        rows.append((day, focus[day], started[day], top_tag))
+        c.executemany("INSERT INTO daily_tags (day, tag, seconds) VALUES (?, ?, ?)",
+                      [(day, tag, secs) for tag, secs in day_tags.items()])
+    c.executemany("INSERT INTO daily_stats (day, focus_seconds, sessions, top_tag) VALUES (?, ?, ?, ?)", rows)
+    _fix_streaks(c, first, last)
+
+
+def _fix_streaks(c, first, last):
+    """
+    Recomputes streak for first..last and the days after it, stopping at the
+    first later day whose stored value is already right.
+    """
+    c.execute("SELECT streak FROM daily_stats WHERE day = ?", (first - 1,))
+    row = c.fetchone()
+    prev_day, prev_streak = first - 1, (row[0] if row else 0)
+    c.execute("SELECT day, focus_seconds, streak FROM daily_stats WHERE day >= ? ORDER BY day", (first,))
+    updates = []
+    for day, focus_seconds, old in c: # Streams; usually stops right after `last`
+        if focus_seconds <= 0:
+            new = 0
+        else:
+            new = prev_streak + 1 if day == prev_day + 1 else 1
+        if day > last and new == old:
+            break # Everything after depends only on this day, which didn't change
+        if new != old:
+            updates.append((new, day))
+        prev_day, prev_streak = day, new
+    c.executemany("UPDATE daily_stats SET streak = ? WHERE day = ?", updates)
+
+
+def refresh_sessions(c, session_ids, extra_days=()):
+    """Updates the index for sessions that were stopped, deleted, merged or edited."""
+    refresh_days(c, session_days(c, session_ids) | set(extra_days))
+
+
+def rebuild(c):
+    """Rebuilds the whole index from the sessions table."""
+    c.execute("DELETE FROM daily_stats")
+    c.execute("DELETE FROM daily_tags")
+    c.execute("SELECT MIN(start_ts), MAX(end_ts) FROM sessions WHERE deleted = 0 AND end_ts > 0")
+    first_ts, last_ts = c.fetchone()
+    if first_ts is None:
+        return
+    first, last = day_of(first_ts), day_of(last_ts)
+    # A year at a time keeps memory flat on long histories
+    for year_start in range(first, last + 1, 366):
+        _refresh_run(c, year_start, min(year_start + 365, last))
+
+
+def backfill_if_empty(c):
+    """Builds the index once for databases created before it existed."""
+    c.execute("SELECT 1 FROM daily_stats LIMIT 1")
+    if c.fetchone():
+        return
+    c.execute("SELECT 1 FROM sessions WHERE deleted = 0 AND end_ts > 0 LIMIT 1")
+    if c.fetchone():
+        rebuild(c)
+
+
+# --- Queries ---
+def heatmap(c, year):
+    """Columnar per-day values for a calendar year (compact format, like ?format=compact)."""
+    first = (datetime.date(year, 1, 1) - EPOCH_DATE).days
+    last = (datetime.date(year, 12, 31) - EPOCH_DATE).days
+    n = last - first + 1
+    seconds, sessions, top_tags = [0] * n, [0] * n, [None] * n
+    c.execute("SELECT day, focus_seconds, sessions, top_tag FROM daily_stats WHERE day BETWEEN ? AND ?", (first, last))
+    for day, focus_seconds, count, top_tag in c.fetchall():
+        i = day - first
+        seconds[i], sessions[i], top_tags[i] = focus_seconds, count, top_tag
+    return {'year': year, 'start_day': first, 'seconds': seconds, 'sessions': sessions, 'top_tag': top_tags}
+
+
+def streaks(c, today=None):
+    """Current streak (ending today, or yesterday if nothing is logged today yet) and the longest one."""
+    today_day = ((today or datetime.date.today()) - EPOCH_DATE).days
+    c.execute("SELECT day, streak FROM daily_stats WHERE day IN (?, ?) AND focus_seconds > 0", (today_day - 1, today_day))
+    by_day = dict(c.fetchall())
+    current = by_day.get(today_day) or by_day.get(today_day - 1) or 0
+    c.execute("SELECT day, streak FROM daily_stats ORDER BY streak DESC, day DESC LIMIT 1")
+    row = c.fetchone()
+    longest, longest_end = (row[1], row[0]) if row and row[1] else (0, None)
+    return {
+        'current': current,
+        'today_active': today_day in by_day,
+        'longest': longest,
+        'longest_start_day': longest_end - longest + 1 if longest_end is not None else None,
+        'longest_end_day': longest_end
+    }
@@ -0,0 +1,54 @@
+"""
+SQLite connection helper.
+
+connect() returns a regular sqlite3 connection whose execute/executemany
+calls are timed into metrics.DB_QUERY_LATENCY, labelled by statement type
+and table (e.g. 'SELECT activity_log'). Statements slower than
+config.SLOW_QUERY_MS are also written to the slow-query log.
+"""
+import time
+import sqlite3
+
+from . import metrics
+from .config import DB_FILE, SLOW_QUERY_MS
+from .profiling import record_slow_query
+
+SLOW_QUERY_SECONDS = SLOW_QUERY_MS / 1000.0 if SLOW_QUERY_MS is not None else None
+
+
+def _observe(cursor, sql, params, start):
+    elapsed = time.perf_counter() - start
+    metrics.DB_QUERY_LATENCY.observe(elapsed, statement=metrics.statement_label(sql))
+    if SLOW_QUERY_SECONDS is not None and elapsed >= SLOW_QUERY_SECONDS:
+        record_slow_query(cursor.connection, sql, params, elapsed)
+
+
+class InstrumentedCursor(sqlite3.Cursor):
+    def execute(self, sql, parameters=()):
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            _observe(self, sql, parameters, start)
+
+    def executemany(self, sql, seq_of_parameters):
+        start = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            _observe(self, sql, None, start) # Parameters may be a consumed generator
+
+
+class InstrumentedConnection(sqlite3.Connection):
+    def cursor(self, factory=InstrumentedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+
+def connect(db_file=DB_FILE, **kwargs):
+    return sqlite3.connect(db_file, factory=InstrumentedConnection, **kwargs)
@@ -0,0 +1,180 @@
+"""
+Background deletion of sessions.
+
+Deleting a session used to remove all of its activity_log rows in one
+transaction inside the request, holding the write lock (and stalling the
+tracker) for multi-hour sessions. Now:
+
+  1. enqueue_delete() marks the sessions deleted (sessions.deleted = 1), so
+     they disappear from every listing and analytics query right away, and
+     records a job in delete_jobs.
+  2. A single worker thread removes the rows in small transactions of
+     CHUNK_ROWS rows, pausing between chunks so other writers get the lock,
+     and updates the job's progress as it goes.
+
+Jobs survive restarts: unfinished ones are picked up again when the worker
+starts.
+"""
+import json
+import time
+import logging
+import threading
+
+from . import daily, metrics
+from .db import connect
+
+CHUNK_ROWS = 500        # activity_log rows per transaction
+CHUNK_PAUSE = 0.05      # seconds between chunks
+IDLE_POLL = 30.0        # seconds between checks for leftover jobs
+
+log = logging.getLogger('studytrack.deletion')
+
+DELETED_ROWS = metrics.Counter('studytrack_deleted_rows_total', 'Rows removed by background delete jobs', ('table',))
+
+_worker = None
+_worker_lock = threading.Lock()
+
+
+def init_tables(c):
+    c.execute('''
+    CREATE TABLE IF NOT EXISTS delete_jobs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        session_ids TEXT,
+        status TEXT DEFAULT 'pending',
+        total_sessions INTEGER DEFAULT 0,
+        deleted_sessions INTEGER DEFAULT 0,
+        deleted_rows INTEGER DEFAULT 0,
+        created_ts INTEGER,
+        finished_ts INTEGER,
+        error TEXT
+    )
+    ''')
+
+
+def enqueue_delete(conn, session_ids):
+    """
+    Marks the sessions deleted and queues a job to remove their rows.
+    Returns (job_id, ids_marked). Only ids that exist and aren't already deleted are queued.
+    """
+    c = conn.cursor()
+    ids = sorted({int(sid) for sid in session_ids})
+    marked = []
+    # Stay under SQLite's host parameter limit
+    for i in range(0, len(ids), 500):
+        chunk = ids[i:i + 500]
+        placeholders = ','.join('?' for _ in chunk)
+        c.execute(f"SELECT id FROM sessions WHERE deleted = 0 AND id IN ({placeholders})", chunk)
+        found = [row[0] for row in c.fetchall()]
+        if found:
+            placeholders = ','.join('?' for _ in found)
+            c.execute(f"UPDATE sessions SET deleted = 1 WHERE id IN ({placeholders})", found)
+            marked.extend(found)
+
+    if not marked:
+        conn.commit()
+        return None, []
+
+    daily.refresh_sessions(c, marked) # Drop them from the per-day index
+
+    c.execute("INSERT INTO delete_jobs (session_ids, status, total_sessions, created_ts) VALUES (?, 'pending', ?, ?)",
+              (json.dumps(marked), len(marked), int(time.time())))
+    job_id = c.lastrowid
+    conn.commit()
+    if _worker is not None:
+        _worker.wake()
+    return job_id, marked
+
+
+def get_job(conn, job_id):
+    c = conn.cursor()
+    c.execute('''SELECT id, status, total_sessions, deleted_sessions, deleted_rows, created_ts, finished_ts, error
+                 FROM delete_jobs WHERE id = ?''', (job_id,))
+    row = c.fetchone()
+    if not row:
+        return None
+    keys = ('id', 'status', 'total_sessions', 'deleted_sessions', 'deleted_rows', 'created_ts', 'finished_ts', 'error')
+    job = dict(zip(keys, row))
+    job['progress'] = round(job['deleted_sessions'] / job['total_sessions'], 3) if job['total_sessions'] else 1.0
+    return job
+
+
+class DeletionWorker(threading.Thread):
+    """Drains delete_jobs one chunk at a time."""
+    def __init__(self, db_file):
+        super().__init__(daemon=True, name='studytrack-deletion')
+        self.db_file = db_file
+        self._wake = threading.Event()
+
+    def wake(self):
+        self._wake.set()
+
+    def run(self):
+        while True:
+            try:
+                while self._run_next_job():
+                    pass
+            except Exception as e:
+                log.error("Delete worker error: %s", e)
+            self._wake.wait(IDLE_POLL)
+            self._wake.clear()
+
+    def _run_next_job(self):
+        """Processes the oldest unfinished job. Returns False when there is none."""
+        conn = connect(self.db_file)
+        try:
+            c = conn.cursor()
+            c.execute("SELECT id, session_ids, deleted_sessions FROM delete_jobs WHERE status IN ('pending', 'running') ORDER BY id LIMIT 1")
+            row = c.fetchone()
+            if not row:
+                return False
+            job_id, session_ids, done = row
+            c.execute("UPDATE delete_jobs SET status = 'running' WHERE id = ?", (job_id,))
+            conn.commit()
+
+            try:
+                # Sessions before `done` were fully removed before a restart
+                for sid in json.loads(session_ids)[done:]:
+                    self._delete_session(conn, job_id, sid)
+            except Exception as e:
+                c.execute("UPDATE delete_jobs SET status = 'failed', error = ?, finished_ts = ? WHERE id = ?",
+                          (str(e), int(time.time()), job_id))
+                conn.commit()
+                log.error("Delete job %s failed: %s", job_id, e)
+                return True
+
+            c.execute("UPDATE delete_jobs SET status = 'done', finished_ts = ? WHERE id = ?", (int(time.time()), job_id))
+            conn.commit()
+            log.info("Delete job %s done", job_id)
+            return True
+        finally:
+            conn.close()
+
+    def _delete_session(self, conn, job_id, sid):
+        c = conn.cursor()
+        while True:
+            c.execute('''DELETE FROM activity_log WHERE id IN
+                         (SELECT id FROM activity_log WHERE session_id = ? LIMIT ?)''', (sid, CHUNK_ROWS))
+            removed = c.rowcount
+            c.execute("UPDATE delete_jobs SET deleted_rows = deleted_rows + ? WHERE id = ?", (removed, job_id))
+            conn.commit()
+            DELETED_ROWS.inc(removed, table='activity_log')
+            if removed < CHUNK_ROWS:
+                break
+            time.sleep(CHUNK_PAUSE)
+
+        c.execute("DELETE FROM breaks WHERE session_id = ?", (sid,))
+        DELETED_ROWS.inc(c.rowcount, table='breaks')
+        c.execute("DELETE FROM sessions WHERE id = ? AND deleted = 1", (sid,))
+        DELETED_ROWS.inc(c.rowcount, table='sessions')
+        c.execute("UPDATE delete_jobs SET deleted_sessions = deleted_sessions + 1 WHERE id = ?", (job_id,))
+        conn.commit()
+
+
+def start_worker(db_file):
+    """Starts the process-wide worker once; it resumes any unfinished jobs."""
+    global _worker
+    with _worker_lock:
+        if _worker is None or not _worker.is_alive():
+            _worker = DeletionWorker(db_file)
+            _worker.start()
+    return _worker
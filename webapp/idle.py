@@ -0,0 +1,190 @@
+"""
+Idle / lock-screen detection for the ActivityTracker.
+
+An idle source has one method, idle_seconds(), returning how long the user
+has been inactive (float('inf') while the screen is locked) or None if it
+cannot tell. Sources are pluggable: pass any object with that method as
+ActivityTracker(idle_source=...).
+
+Built-in sources:
+  LockScreenSource     - a screen locker (hyprlock, swaylock, ...) is running
+  IdleStateFileSource  - a state file written by an idle daemon (hypridle's
+                         on-timeout / on-resume) exists
+  LogindIdleSource     - logind's IdleHint for the current session
+  InputActivitySource  - input interrupt counters in /proc/interrupts
+                         stopped changing (keyboard, mouse, touchpad)
+  CompositeIdleSource  - combines several sources
+
+The input heuristic is opt-in (STUDYTRACK_IDLE_INPUT_IRQ=1): not every input
+device has a recognizable line in /proc/interrupts, and a false "idle" turns
+real focus time into a break.
+"""
+import re
+import time
+import subprocess
+import psutil
+
+from .config import IDLE_INPUT_IRQ, IDLE_STATE_FILE
+
+LOCKER_PROCESSES = ('hyprlock', 'swaylock', 'gtklock', 'waylock', 'i3lock', 'physlock')
+# USB keyboards and mice show up as their host controller (xhci_hcd, ...)
+INPUT_IRQ_PATTERN = r'i8042|keyboard|mouse|touchpad|trackpad|elan|synaptics|hid|xhci|ehci|ohci|uhci'
+PROC_INTERRUPTS = '/proc/interrupts'
+# Seconds without input before the idle daemon writes the state file (its listener timeout)
+STATE_FILE_TIMEOUT = 300.0
+
+
+class LockScreenSource:
+    """
+    Reports infinite idle time while a known screen locker process is running.
+    The process list is scanned at most every `check_interval` seconds.
+    """
+    def __init__(self, lockers=LOCKER_PROCESSES, check_interval=5.0):
+        self.lockers = set(lockers)
+        self.check_interval = check_interval
+        self._checked_at = None
+        self._locked = False
+
+    def idle_seconds(self):
+        now = time.monotonic()
+        if self._checked_at is None or now - self._checked_at >= self.check_interval:
+            self._checked_at = now
+            self._locked = any(p.info['name'] in self.lockers for p in psutil.process_iter(['name']))
+        return float('inf') if self._locked else None # Unlocked says nothing about input
+
+
+class IdleStateFileSource:
+    """
+    Reports idle time while a state file exists. An idle daemon creates it
+    once the user has been inactive for `timeout` seconds and removes it on
+    activity, e.g. in hypridle.conf:
+
+      listener {
+          timeout = 300
+          on-timeout = touch ~/.studytrack/idle
+          on-resume = rm -f ~/.studytrack/idle
+      }
+    """
+    def __init__(self, path=IDLE_STATE_FILE, timeout=STATE_FILE_TIMEOUT):
+        self.path = path
+        self.timeout = timeout
+
+    def idle_seconds(self):
+        try:
+            mtime = self.path.stat().st_mtime
+        except OSError:
+            return None # No file: not idle, or no idle daemon configured
+        return max(0.0, time.time() - mtime) + self.timeout
+
+
+class LogindIdleSource:
+    """
+    Reports idle time while logind's IdleHint is set for the current session.
+    Polled with loginctl at most every `check_interval` seconds.
+    """
+    def __init__(self, session='auto', check_interval=5.0):
+        self.session = session
+        self.check_interval = check_interval
+        self._checked_at = None
+        self._idle_since = None
+        self._available = True
+
+    def _query(self):
+        try:
+            result = subprocess.run(
+                ['loginctl', 'show-session', self.session, '-p', 'IdleHint', '-p', 'IdleSinceHint'],
+                capture_output=True, text=True, timeout=2.0
+            )
+        except FileNotFoundError:
+            self._available = False # No systemd-logind here
+            return None
+        except subprocess.TimeoutExpired:
+            return None
+        if result.returncode != 0:
+            return None
+        props = dict(line.split('=', 1) for line in result.stdout.splitlines() if '=' in line)
+        if props.get('IdleHint') != 'yes':
+            return None
+        since = int(props.get('IdleSinceHint') or 0) / 1e6 # usec since the epoch
+        return since if since > 0 else time.time()
+
+    def idle_seconds(self):
+        if not self._available:
+            return None
+        now = time.monotonic()
+        if self._checked_at is None or now - self._checked_at >= self.check_interval:
+            self._checked_at = now
+            self._idle_since = self._query()
+        return max(0.0, time.time() - self._idle_since) if self._idle_since is not None else None
+
+
+class InputActivitySource:
+    """
+    Watches the interrupt counters of input devices. The user is considered
+    idle for as long as the counters have not changed, but only once they
+    have been seen to change at all: lines that never move (an unused PS/2
+    controller, say) say nothing about the devices actually in use.
+    """
+    def __init__(self, path=PROC_INTERRUPTS, pattern=INPUT_IRQ_PATTERN):
+        self.path = path
+        self.pattern = re.compile(pattern, re.IGNORECASE)
+        self._last_total = None
+        self._last_change = time.monotonic()
+        self._seen_change = False
+
+    def _read_total(self):
+        total = 0
+        found = False
+        with open(self.path) as f:
+            next(f, None) # CPU header
+            for line in f:
+                if not self.pattern.search(line):
+                    continue
+                found = True
+                for field in line.split()[1:]:
+                    if not field.isdigit():
+                        break
+                    total += int(field)
+        return total if found else None
+
+    def idle_seconds(self):
+        try:
+            total = self._read_total()
+        except OSError:
+            return None
+        if total is None:
+            return None
+        now = time.monotonic()
+        if total != self._last_total:
+            self._seen_change = self._last_total is not None
+            self._last_total = total
+            self._last_change = now
+        if not self._seen_change:
+            return None
+        return now - self._last_change
+
+
+class CompositeIdleSource:
+    """Idle only as long as every source that knows agrees (shortest idle time wins)."""
+    def __init__(self, sources):
+        self.sources = list(sources)
+
+    def idle_seconds(self):
+        values = []
+        for source in self.sources:
+            try:
+                value = source.idle_seconds()
+            except Exception:
+                value = None
+            if value == float('inf'):
+                return value # Locked screen overrides input activity
+            if value is not None:
+                values.append(value)
+        return min(values) if values else None
+
+
+def default_idle_source():
+    sources = [LockScreenSource(), IdleStateFileSource(), LogindIdleSource()]
+    if IDLE_INPUT_IRQ:
+        sources.append(InputActivitySource())
+    return CompositeIdleSource(sources)
@@ -0,0 +1,234 @@
+"""
+Append-only spill journal for tracker samples.
+
+The tracker never writes samples straight to SQLite any more. Each sample is
+appended as one JSON line ([session_id, timestamp, app_name, window_title])
+to ~/.studytrack/tracker.journal, which is a cheap sequential write that
+cannot block on database locks. drain() then copies pending lines into
+activity_log in batches whenever the database is available.
+
+Samples whose session no longer exists or is marked deleted by the time
+they are replayed are dropped, so a delete job never races a late replay
+into orphan activity_log rows.
+
+Exactly-once replay: the byte offset of the last replayed line is stored in
+the journal_state table and advanced in the same transaction as the
+inserted rows, so a crash at any point either replays a batch or doesn't.
+Once everything is replayed and the file has grown past COMPACT_BYTES it is
+truncated and the offset reset. A torn last line (crash mid-append) is cut
+off when the journal is opened.
+
+Appends take a shared flock and compaction an exclusive one, so the daemon
+and an in-process fallback tracker can share the file safely.
+"""
+import os
+import json
+import fcntl
+import sqlite3
+import logging
+import threading
+from pathlib import Path
+
+from . import metrics
+from .config import JOURNAL_FILE
+from .db import connect
+
+BATCH_ROWS = 500             # rows per replay transaction
+COMPACT_BYTES = 1024 * 1024  # truncate the fully-replayed file past this size
+DRAIN_DB_TIMEOUT = 0.2       # seconds to wait for a DB lock before giving up
+
+log = logging.getLogger('studytrack.journal')
+
+JOURNAL_REPLAYS = metrics.Counter('studytrack_journal_replays_total', 'Journal replay attempts', ('result',))
+JOURNAL_DROPPED = metrics.Counter('studytrack_journal_dropped_samples_total', 'Journaled samples dropped because their session was deleted')
+
+ROW_COLUMNS = 4 # session_id, timestamp, app_name, window_title
+INSERT_LIVE = '''INSERT INTO activity_log (session_id, timestamp, app_name, window_title)
+                 SELECT ?1, ?2, ?3, ?4 WHERE EXISTS (SELECT 1 FROM sessions WHERE id = ?1 AND deleted = 0)'''
+
+_journals = {}
+_journals_lock = threading.Lock()
+
+
+def init_tables(c):
+    c.execute('''
+    CREATE TABLE IF NOT EXISTS journal_state (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        offset INTEGER NOT NULL
+    )
+    ''')
+    c.execute("INSERT OR IGNORE INTO journal_state (id, offset) VALUES (1, 0)")
+
+
+def _parse_line(line):
+    """
+    Decodes one journal line into an INSERT_LIVE row, or None if it isn't
+    [session_id, timestamp, app_name, window_title]. A bad line must not
+    fail the batch, or the offset would never move past it.
+    """
+    try:
+        row = json.loads(line)
+    except ValueError:
+        return None
+    if not isinstance(row, list) or len(row) != ROW_COLUMNS:
+        return None
+    session_id, timestamp, app_name, window_title = row
+    if not isinstance(session_id, int) or isinstance(session_id, bool):
+        return None
+    if not isinstance(timestamp, (int, float)) or isinstance(timestamp, bool):
+        return None
+    if not all(value is None or isinstance(value, str) for value in (app_name, window_title)):
+        return None
+    return tuple(row)
+
+
+class SampleJournal:
+    def __init__(self, path=JOURNAL_FILE):
+        self.path = str(path)
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._lock = threading.Lock() # Serializes appends/drains within this process
+        self._fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600)
+        self._repair_tail()
+
+    def _repair_tail(self):
+        """Cuts off a partial last line left by a crash in the middle of an append."""
+        with open(self.path, 'rb+') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                size = f.seek(0, os.SEEK_END)
+                if size == 0:
+                    return
+                f.seek(size - 1)
+                if f.read(1) == b'\n':
+                    return
+                # Walk back to the previous newline
+                pos = size - 1
+                while pos > 0:
+                    step = min(4096, pos)
+                    f.seek(pos - step)
+                    chunk = f.read(step)
+                    nl = chunk.rfind(b'\n')
+                    if nl != -1:
+                        pos = pos - step + nl + 1
+                        break
+                    pos -= step
+                log.warning("Dropping %d bytes of torn journal tail", size - pos)
+                f.truncate(pos)
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def append(self, session_id, timestamp, app_name, window_title):
+        line = (json.dumps([session_id, timestamp, app_name, window_title], ensure_ascii=False) + '\n').encode('utf-8')
+        with self._lock:
+            fcntl.flock(self._fd, fcntl.LOCK_SH)
+            try:
+                os.write(self._fd, line)
+            finally:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def drain(self, db_file, timeout=DRAIN_DB_TIMEOUT):
+        """
+        Replays pending lines into activity_log. Returns the number of rows
+        written, or None if the database was unavailable (they stay journaled).
+        """
+        with self._lock:
+            try:
+                conn = connect(db_file, timeout=timeout, isolation_level=None)
+            except sqlite3.Error as e:
+                JOURNAL_REPLAYS.inc(result='unavailable')
+                log.debug("Journal replay deferred: %s", e)
+                return None
+            try:
+                written = self._drain(conn)
+                JOURNAL_REPLAYS.inc(result='ok')
+                return written
+            except sqlite3.OperationalError as e: # Locked, busy, read-only...
+                JOURNAL_REPLAYS.inc(result='unavailable')
+                log.debug("Journal replay deferred: %s", e)
+                return None
+            finally:
+                conn.close()
+
+    def _drain(self, conn):
+        c = conn.cursor()
+        written = 0
+        with open(self.path, 'rb') as f:
+            while True:
+                # IMMEDIATE: the offset is read under the write lock, so two
+                # processes can never replay the same lines
+                c.execute("BEGIN IMMEDIATE")
+                try:
+                    init_tables(c)
+                    c.execute("SELECT offset FROM journal_state WHERE id = 1")
+                    offset = c.fetchone()[0]
+                    size = os.fstat(f.fileno()).st_size
+                    if offset > size: # File was compacted but the reset didn't commit
+                        offset = 0
+                    f.seek(offset)
+                    rows = []
+                    while len(rows) < BATCH_ROWS:
+                        line = f.readline()
+                        if not line.endswith(b'\n'):
+                            break # EOF, or a line still being written
+                        offset += len(line)
+                        row = _parse_line(line)
+                        if row is None:
+                            log.warning("Skipping corrupt journal line at offset %d", offset - len(line))
+                        else:
+                            rows.append(row)
+                    inserted = 0
+                    if rows:
+                        # Samples of sessions deleted while they were journaled are dropped
+                        c.executemany(INSERT_LIVE, rows)
+                        inserted = c.rowcount
+                    c.execute("UPDATE journal_state SET offset = ? WHERE id = 1", (offset,))
+                    c.execute("COMMIT")
+                except Exception:
+                    c.execute("ROLLBACK")
+                    raise
+                if inserted:
+                    metrics.DB_WRITE_BATCH.observe(inserted)
+                if len(rows) > inserted:
+                    JOURNAL_DROPPED.inc(len(rows) - inserted)
+                    log.info("Dropped %d journaled samples of deleted sessions", len(rows) - inserted)
+                written += inserted
+                if len(rows) < BATCH_ROWS:
+                    break
+
+        if offset >= COMPACT_BYTES:
+            self._compact(c, offset)
+        return written
+
+    def _compact(self, c, offset):
+        """Truncates the journal once everything in it has been replayed."""
+        fcntl.flock(self._fd, fcntl.LOCK_EX)
+        try:
+            if os.fstat(self._fd).st_size != offset:
+                return # Someone appended meanwhile; try again next time
+            os.truncate(self.path, 0)
+        finally:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+        # If we crash before this commits, drain() sees offset > size and resets it
+        c.execute("UPDATE journal_state SET offset = 0 WHERE id = 1")
+
+
+def get_journal(path=JOURNAL_FILE):
+    """One SampleJournal per file and process."""
+    path = str(path)
+    with _journals_lock:
+        if path not in _journals:
+            _journals[path] = SampleJournal(path)
+        return _journals[path]
+
+
+def journal_for(db_file):
+    """The journal kept next to a database file (tracker.journal in DATA_DIR by default)."""
+    return get_journal(Path(db_file).with_name(JOURNAL_FILE.name))
+
+
+def recover(db_file):
+    """Replays samples left behind by a crashed or killed tracker. Called on startup."""
+    written = journal_for(db_file).drain(db_file, timeout=5.0)
+    if written:
+        log.info("Replayed %d journaled samples", written)
+    return written
@@ -0,0 +1,39 @@
+# Logging setup shared by the web server and the tracker daemon.
+import os
+import time
+import logging
+import threading
+
+LOG_FORMAT = "%(asctime)s %(levelname)s [%(name)s] %(message)s"
+
+
+def setup_logging(level=None):
+    """Configures the root logger. Level defaults to $STUDYTRACK_LOG_LEVEL or INFO."""
+    level = level or os.environ.get('STUDYTRACK_LOG_LEVEL', 'INFO')
+    logging.basicConfig(level=level.upper(), format=LOG_FORMAT)
+
+
+class RateLimitedLogger:
+    """
+    Emits at most one record per key every `interval` seconds.
+    Suppressed records are counted and reported with the next one that gets through.
+    """
+    def __init__(self, logger, interval=60.0):
+        self.logger = logger
+        self.interval = interval
+        self._state = {} # key -> (last_emit, suppressed)
+        self._lock = threading.Lock()
+
+    def log(self, level, key, msg, *args):
+        if not self.logger.isEnabledFor(level):
+            return
+        now = time.monotonic()
+        with self._lock:
+            last, suppressed = self._state.get(key, (None, 0))
+            if last is not None and now - last < self.interval:
+                self._state[key] = (last, suppressed + 1)
+                return
+            self._state[key] = (now, 0)
+        if suppressed:
+            msg += f" ({suppressed} similar messages suppressed)"
+        self.logger.log(level, msg, *args)
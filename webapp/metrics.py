@@ -0,0 +1,174 @@
+"""
+In-process instrumentation: counters and histograms, rendered in the
+Prometheus text format at /api/metrics and as JSON for /diagnostics.
+
+Each process (web server, tracker daemon) has its own registry. The web
+server asks the daemon for its snapshot over the control socket and renders
+both, labelled process="web" / process="tracker".
+"""
+import re
+import time
+import threading
+
+# Default buckets in seconds (1 ms .. 10 s)
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+JITTER_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.0)
+SIZE_BUCKETS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000)
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._series = {}
+        REGISTRY.append(self)
+
+    def _key(self, labels):
+        return tuple(str(labels.get(n, '')) for n in self.labelnames)
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._series[key] = self._series.get(key, 0) + amount
+
+    def _snapshot_series(self):
+        return [{'labels': dict(zip(self.labelnames, k)), 'value': v} for k, v in self._series.items()]
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = {'counts': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series['counts'][i] += 1
+                    break
+            series['sum'] += value
+            series['count'] += 1
+
+    def _snapshot_series(self):
+        out = []
+        for k, s in self._series.items():
+            cumulative, running = [], 0
+            for bound, n in zip(self.buckets, s['counts']):
+                running += n
+                cumulative.append([bound, running])
+            out.append({'labels': dict(zip(self.labelnames, k)), 'buckets': cumulative,
+                        'sum': s['sum'], 'count': s['count']})
+        return out
+
+
+REGISTRY = []
+
+HTTP_LATENCY = Histogram('studytrack_http_request_duration_seconds', 'Request latency by route',
+                         ('route', 'method', 'status'))
+DB_QUERY_LATENCY = Histogram('studytrack_db_query_duration_seconds', 'SQLite statement execution time',
+                             ('statement',))
+DB_WRITE_BATCH = Histogram('studytrack_db_write_batch_rows', 'Rows written per tracker DB transaction',
+                           buckets=SIZE_BUCKETS)
+TRACKER_JITTER = Histogram('studytrack_tracker_tick_jitter_seconds', 'Delay between scheduled and actual sample time',
+                           buckets=JITTER_BUCKETS)
+TRACKER_MISSED_TICKS = Counter('studytrack_tracker_missed_ticks_total', 'Sample ticks skipped because the loop fell behind')
+TRACKER_IDLE_SPANS = Counter('studytrack_tracker_idle_spans_total', 'Idle spans recorded as automatic breaks')
+TRACKER_SAMPLES = Counter('studytrack_tracker_samples_total', 'Activity samples taken', ('result',))
+CACHE_REQUESTS = Counter('studytrack_cache_requests_total', 'Cache lookups', ('cache', 'result'))
+
+
+def snapshot():
+    """Returns every metric in this process as plain JSON-able data."""
+    families = []
+    for m in REGISTRY:
+        with m._lock:
+            series = m._snapshot_series()
+        families.append({'name': m.name, 'type': m.kind, 'help': m.help, 'series': series})
+    return families
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    body = ','.join(f'{k}="{_escape(v)}"' for k, v in labels.items())
+    return '{' + body + '}'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def render_prometheus(snapshots):
+    """
+    Renders {process_name: snapshot()} in the Prometheus text exposition format,
+    adding a `process` label so the same family can come from several processes.
+    """
+    families = {}
+    for process, snap in snapshots.items():
+        for fam in snap or []:
+            entry = families.setdefault(fam['name'], {'type': fam['type'], 'help': fam['help'], 'series': []})
+            for s in fam['series']:
+                entry['series'].append(dict(s, labels=dict(s['labels'], process=process)))
+
+    lines = []
+    for name, fam in families.items():
+        lines.append(f"# HELP {name} {fam['help']}")
+        lines.append(f"# TYPE {name} {fam['type']}")
+        for s in fam['series']:
+            labels = s['labels']
+            if fam['type'] == 'histogram':
+                for bound, count in s['buckets']:
+                    lines.append(f"{name}_bucket{_format_labels(dict(labels, le=f'{bound:g}'))} {count}")
+                lines.append(f"{name}_bucket{_format_labels(dict(labels, le='+Inf'))} {s['count']}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {s['sum']:.6f}")
+                lines.append(f"{name}_count{_format_labels(labels)} {s['count']}")
+            else:
+                lines.append(f"{name}{_format_labels(labels)} {s['value']:g}")
+    return '\n'.join(lines) + '\n'
+
+
+# --- SQL statement labels ---
+_TABLE_RE = re.compile(r'\b(?:FROM|INTO|UPDATE|TABLE(?:\s+IF\s+NOT\s+EXISTS)?)\s+(\w+)', re.IGNORECASE)
+
+
+def statement_label(sql):
+    """Collapses a SQL statement into a low-cardinality label like 'SELECT sessions'."""
+    words = sql.split(None, 1)
+    if not words:
+        return 'EMPTY'
+    verb = words[0].upper()
+    m = _TABLE_RE.search(sql)
+    return f"{verb} {m.group(1)}" if m else verb
+
+
+# --- Flask integration ---
+def init_app(app):
+    """Records per-route latency for every request."""
+    from flask import g, request
+
+    @app.before_request
+    def _metrics_start():
+        g._metrics_start = time.perf_counter()
+
+    @app.after_request
+    def _metrics_stop(response):
+        start = g.pop('_metrics_start', None)
+        if start is not None:
+            route = request.url_rule.rule if request.url_rule else 'unmatched'
+            HTTP_LATENCY.observe(time.perf_counter() - start, route=route,
+                                 method=request.method, status=response.status_code)
+        return response
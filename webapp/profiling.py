@@ -0,0 +1,115 @@
+"""
+Opt-in request profiling and the slow-query log.
+
+Request profiling (config.PROFILE_MODE):
+  'off'     - no hooks are registered, zero per-request cost
+  'request' - only requests with an `X-StudyTrack-Profile: 1` header or a
+              `?_profile=1` query flag are profiled
+  'all'     - every request is profiled
+
+Each profiled request is run under cProfile and dumped to
+~/.studytrack/profiles/<time>_<route>_<ms>.prof (open with `python -m pstats`
+or snakeviz). The file name is returned in the X-StudyTrack-Profile header.
+
+Slow-query log (config.SLOW_QUERY_MS): every statement slower than the
+threshold is appended as one JSON line to ~/.studytrack/slow_queries.log with
+its SQL text, parameters, duration and EXPLAIN QUERY PLAN output.
+"""
+import re
+import json
+import time
+import cProfile
+import logging
+import sqlite3
+import threading
+
+from .config import PROFILE_MODE, PROFILES_DIR, SLOW_QUERY_LOG
+
+PROFILE_HEADER = 'X-StudyTrack-Profile'
+PROFILE_QUERY_FLAG = '_profile'
+
+log = logging.getLogger('studytrack.profiling')
+_slow_log_lock = threading.Lock()
+
+
+# --- Request profiling ---
+def _wants_profile(request):
+    if PROFILE_MODE == 'all':
+        return True
+    return request.headers.get(PROFILE_HEADER) == '1' or request.args.get(PROFILE_QUERY_FLAG) == '1'
+
+
+def init_app(app, mode=PROFILE_MODE):
+    """Registers the profiling hooks unless profiling is switched off."""
+    if mode == 'off':
+        return
+    from flask import g, request
+
+    @app.before_request
+    def _profile_start():
+        if not _wants_profile(request):
+            return
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError as e: # Another profiler is already active in this thread
+            log.warning("Not profiling %s: %s", request.path, e)
+            return
+        g._profiler = (profiler, time.perf_counter())
+
+    @app.after_request
+    def _profile_stop(response):
+        entry = g.pop('_profiler', None)
+        if entry is None:
+            return response
+        profiler, start = entry
+        profiler.disable()
+        elapsed_ms = int((time.perf_counter() - start) * 1000)
+        route = request.url_rule.rule if request.url_rule else request.path
+        slug = re.sub(r'[^A-Za-z0-9]+', '_', route).strip('_') or 'root'
+        PROFILES_DIR.mkdir(parents=True, exist_ok=True)
+        path = PROFILES_DIR / f"{time.strftime('%Y%m%d-%H%M%S')}_{slug}_{elapsed_ms}ms.prof"
+        try:
+            profiler.dump_stats(str(path))
+            response.headers[PROFILE_HEADER] = path.name
+            log.info("Profiled %s in %d ms -> %s", request.path, elapsed_ms, path)
+        except OSError as e:
+            log.warning("Could not write profile %s: %s", path, e)
+        return response
+
+
+# --- Slow-query log ---
+def _jsonable(params):
+    if isinstance(params, dict):
+        return {k: _jsonable(v) for k, v in params.items()}
+    if isinstance(params, (list, tuple)):
+        return [_jsonable(p) for p in params]
+    if params is None or isinstance(params, (int, float, str)):
+        return params
+    return repr(params)
+
+
+def record_slow_query(conn, sql, params, elapsed):
+    """Appends one slow statement (with its query plan) to the slow-query log."""
+    plan = None
+    if params is not None and sql.lstrip().split(None, 1)[0].upper() in ('SELECT', 'INSERT', 'UPDATE', 'DELETE', 'REPLACE', 'WITH'):
+        try:
+            # Plain cursor, so the EXPLAIN itself isn't timed or logged
+            cur = sqlite3.Cursor(conn)
+            plan = [row[-1] for row in cur.execute(f"EXPLAIN QUERY PLAN {sql}", params).fetchall()]
+            cur.close()
+        except sqlite3.Error as e:
+            plan = [f"EXPLAIN failed: {e}"]
+
+    entry = {
+        'ts': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'duration_ms': round(elapsed * 1000, 3),
+        'sql': ' '.join(sql.split()),
+        'params': _jsonable(params),
+        'plan': plan
+    }
+    try:
+        with _slow_log_lock, open(SLOW_QUERY_LOG, 'a') as f:
+            f.write(json.dumps(entry) + '\n')
+    except OSError as e:
+        log.warning("Could not write slow-query log: %s", e)
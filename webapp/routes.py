@@ -1,22 +1,26 @@
 import os
 import time
-import sqlite3
 import datetime # Make sure this is here
-from flask import Flask, render_template, request, jsonify
+from flask import Flask, Response, render_template, request, jsonify
 from pathlib import Path
-from .tracker import ActivityTracker 
+from . import backup, compression, daily, deletion, journal, metrics, profiling, sync, timeline
+from .config import DB_FILE
+from .control import NO_DAEMON_ERRORS, SOCKET_TIMEOUT, STOP_TIMEOUT, STOPPING_COMMANDS, send_command
+from .daemon import TrackerController
+from .db import connect
+from .sessions import sec_to_hhmmss, get_total_break_time, get_live_status
 
-DATA_DIR = Path.home() / ".studytrack"
-DATA_DIR.mkdir(parents=True, exist_ok=True)
-DB_FILE = DATA_DIR / "studytrack.db"
-
-CURRENT_TRACKER = None
+# Used only when no tracker daemon is running (e.g. `studytrack --runserver`)
+LOCAL_TRACKER = TrackerController(DB_FILE)
 
 LOG_INTERVAL_SECONDS = 1.0 
 
 # --- DB simple helpers ---
-def init_db():
-    conn = sqlite3.connect(DB_FILE)
+def init_db(db_file=DB_FILE):
+    Path(db_file).parent.mkdir(parents=True, exist_ok=True)
+    conn = connect(db_file)
+    # WAL: readers (requests, backups) and the tracker's writes don't block each other
+    conn.execute("PRAGMA journal_mode=WAL")
     c = conn.cursor()
     # Sessions table
     c.execute('''
@@ -51,29 +55,83 @@ def init_db():
         FOREIGN KEY (session_id) REFERENCES sessions (id)
     )
     ''')
+    # --- Migrations for older databases ---
+    add_column_if_missing(c, 'sessions', 'deleted', 'INTEGER DEFAULT 0')
+    add_column_if_missing(c, 'breaks', 'kind', "TEXT DEFAULT 'manual'") # 'manual' or 'idle'
+    # Multi-machine merge (see sync.py)
+    add_column_if_missing(c, 'sessions', 'uuid', 'TEXT')
+    add_column_if_missing(c, 'sessions', 'origin', 'TEXT')
+    add_column_if_missing(c, 'sessions', 'rev', 'INTEGER DEFAULT 0')
+    # Per-session scans (summary, chunked deletes) need this
+    c.execute("CREATE INDEX IF NOT EXISTS idx_activity_session_ts ON activity_log (session_id, timestamp)")
+    deletion.init_tables(c)
+    journal.init_tables(c)
+    sync.init_tables(c)
+    daily.init_tables(c)
+    daily.backfill_if_empty(c) # First start after upgrading
     conn.commit()
     conn.close()
-    
-# --- HELPER: Format Time ---
-def sec_to_hhmmss(seconds):
-    seconds = int(seconds or 0)
-    h = seconds // 3600
-    m = (seconds % 3600) // 60
-    s = seconds % 60
-    return f"{h}h {m:02d}m {s:02d}s"
-
-# --- HELPER: Get total break time ---
-def get_total_break_time(conn, session_id):
-    c = conn.cursor()
-    c.execute("SELECT SUM(resume_ts - pause_ts) FROM breaks WHERE session_id = ? AND resume_ts IS NOT NULL", (session_id,))
-    total_break = c.fetchone()[0] or 0
-    return total_break
+
+def add_column_if_missing(c, table, column, decl):
+    c.execute(f"PRAGMA table_info({table})")
+    if column not in [row[1] for row in c.fetchall()]:
+        c.execute(f"ALTER TABLE {table} ADD COLUMN {column} {decl}")
+
+# --- HELPER: Tracker control ---
+def tracker_command(cmd, session_id=None):
+    """
+    Sends a command to the tracker daemon, falling back to an in-process
+    tracker only when no daemon is listening. Commands that stop a tracker
+    wait up to STOP_TIMEOUT for its final writes; a daemon that still hasn't
+    replied is reported as an error, so two trackers never sample the same
+    session.
+    """
+    timeout = STOP_TIMEOUT if cmd in STOPPING_COMMANDS else SOCKET_TIMEOUT
+    try:
+        reply = send_command(cmd, session_id=session_id, timeout=timeout)
+    except NO_DAEMON_ERRORS:
+        return LOCAL_TRACKER.handle(cmd, session_id)
+    except OSError as e:
+        print(f"Tracker daemon did not answer '{cmd}': {e}")
+        return {'success': False, 'error': f'tracker daemon did not answer: {e}'}
+    # The daemon owns tracking now; retire a tracker started before it came up
+    if LOCAL_TRACKER.handle('status')['tracking']:
+        LOCAL_TRACKER.handle('stop')
+    return reply
+
+# --- HELPER: Compact responses ---
+# ?format=compact returns columnar arrays of raw integers (seconds, epoch
+# days) instead of row objects and preformatted strings; the templates
+# format them client-side.
+EPOCH_DATE = datetime.date(1970, 1, 1)
+# Local calendar day of a timestamp as days since 1970-01-01, in SQL
+SQL_EPOCH_DAY = "CAST(julianday(start_ts, 'unixepoch', 'localtime', 'start of day') - 2440587.5 AS INTEGER)"
+
+def wants_compact():
+    return request.args.get('format') == 'compact'
+
+def epoch_day(date):
+    return (date - EPOCH_DATE).days
+
+def daily_seconds(rows, first_day, last_day):
+    """Spreads (epoch_day, seconds) rows over a dense list for first_day..last_day."""
+    seconds = [0] * (last_day - first_day + 1)
+    for day, total in rows:
+        if first_day <= day <= last_day:
+            seconds[day - first_day] += total or 0
+    return seconds
 
 # --- MAIN APP ---
 def create_app():
     app = Flask(__name__, template_folder='templates', static_folder='static')
     
     init_db() # Ensure DB is created on startup
+    journal.recover(DB_FILE) # Samples a crashed tracker couldn't write yet
+    deletion.start_worker(DB_FILE) # Resumes unfinished delete jobs
+    backup.start_worker(DB_FILE) # On-demand and scheduled backups
+    compression.init_app(app) # Registered first so it runs after the other after_request hooks
+    metrics.init_app(app)
+    profiling.init_app(app)
 
     # === PAGE ROUTES ===
 
@@ -97,24 +155,23 @@ def create_app():
     def session_summary_page(session_id):
         return render_template('summary.html', page_id='summary', session_id=session_id)
 
+    @app.route('/diagnostics')
+    def diagnostics_page():
+        return render_template('diagnostics.html', page_id='diagnostics')
+
     # === API ROUTES ===
 
     @app.route('/api/start', methods=['POST'])
     def api_start():
-        global CURRENT_TRACKER 
         data = request.get_json() or {}
         name = data.get('name','').strip()
         tags = data.get('tags','').strip()
         duration = data.get('duration', 0) # <-- ADDED THIS
         if not name:
             return jsonify({'success': False, 'error': 'no name'}), 400
-        
-        if CURRENT_TRACKER and CURRENT_TRACKER.is_alive():
-            CURRENT_TRACKER.stop()
-            CURRENT_TRACKER.join()
             
         start_ts = int(time.time())
-        conn = sqlite3.connect(DB_FILE)
+        conn = connect(DB_FILE)
         c = conn.cursor()
         # --- UPDATED THIS QUERY ---
         c.execute('INSERT INTO sessions (name, tags, start_ts, end_ts, duration, target_duration) VALUES (?,?,?,?,?,?)',
@@ -123,25 +180,20 @@ def create_app():
         conn.commit()
         conn.close()
         
-        CURRENT_TRACKER = ActivityTracker(session_id=sid, db_file=DB_FILE)
-        CURRENT_TRACKER.start()
+        tracker_command('start', sid)
         
         return jsonify({'success': True, 'session': {'id': sid, 'name': name, 'tags': tags, 'start_ts': start_ts}})
 
     @app.route('/api/pause', methods=['POST'])
     def api_pause():
-        global CURRENT_TRACKER
         data = request.get_json() or {}
         sid = data.get('session_id')
         if not sid:
             return jsonify({'success': False, 'error': 'no session_id'}), 400
 
-        if CURRENT_TRACKER and CURRENT_TRACKER.is_alive() and CURRENT_TRACKER.session_id == sid:
-            CURRENT_TRACKER.stop()
-            CURRENT_TRACKER.join()
-            CURRENT_TRACKER = None
+        tracker_command('pause', sid)
         
-        conn = sqlite3.connect(DB_FILE)
+        conn = connect(DB_FILE)
         c = conn.cursor()
         c.execute("UPDATE breaks SET resume_ts = ? WHERE session_id = ? AND resume_ts IS NULL", (int(time.time()), sid))
         c.execute("INSERT INTO breaks (session_id, pause_ts, resume_ts) VALUES (?, ?, NULL)", (sid, int(time.time())))
@@ -152,42 +204,32 @@ def create_app():
 
     @app.route('/api/resume', methods=['POST'])
     def api_resume():
-        global CURRENT_TRACKER
         data = request.get_json() or {}
         sid = data.get('session_id')
         if not sid:
             return jsonify({'success': False, 'error': 'no session_id'}), 400
             
-        conn = sqlite3.connect(DB_FILE)
+        conn = connect(DB_FILE)
         c = conn.cursor()
         c.execute("UPDATE breaks SET resume_ts = ? WHERE session_id = ? AND resume_ts IS NULL", (int(time.time()), sid))
         conn.commit()
         conn.close()
         
-        if CURRENT_TRACKER and CURRENT_TRACKER.is_alive():
-             CURRENT_TRACKER.stop()
-             CURRENT_TRACKER.join()
-
-        CURRENT_TRACKER = ActivityTracker(session_id=sid, db_file=DB_FILE)
-        CURRENT_TRACKER.start()
+        tracker_command('resume', sid)
         
         return jsonify({'success': True, 'status': 'running'})
 
     @app.route('/api/stop', methods=['POST'])
     def api_stop():
-        global CURRENT_TRACKER 
         data = request.get_json() or {}
         sid = data.get('session_id')
         if not sid:
             return jsonify({'success': False, 'error':'no session_id'}), 400
             
-        if CURRENT_TRACKER and CURRENT_TRACKER.is_alive() and CURRENT_TRACKER.session_id == sid:
-            CURRENT_TRACKER.stop()
-            CURRENT_TRACKER.join()
-            CURRENT_TRACKER = None
+        tracker_command('stop', sid)
             
         end_ts = int(time.time())
-        conn = sqlite3.connect(DB_FILE)
+        conn = connect(DB_FILE)
         c = conn.cursor()
         
         c.execute("UPDATE breaks SET resume_ts = ? WHERE session_id = ? AND resume_ts IS NULL", (end_ts, sid))
@@ -206,6 +248,7 @@ def create_app():
         if final_duration < 0: final_duration = 0 
 
         c.execute('UPDATE sessions SET end_ts=?, duration=? WHERE id=?', (end_ts, final_duration, sid))
+        daily.refresh_sessions(c, [sid]) # Split across midnight into the per-day index
         conn.commit()
         conn.close()
         
@@ -217,64 +260,23 @@ def create_app():
     # --- THIS IS THE NEW, SMART /api/status ---
     @app.route('/api/status')
     def api_status():
-        global CURRENT_TRACKER
-        conn = sqlite3.connect(DB_FILE)
-        c = conn.cursor()
-        
-        # Get target_duration as well
-        c.execute('SELECT id, name, tags, start_ts, target_duration FROM sessions WHERE end_ts=0 ORDER BY start_ts DESC LIMIT 1')
-        session_row = c.fetchone()
-        
-        if not session_row:
-            if CURRENT_TRACKER and CURRENT_TRACKER.is_alive():
-                CURRENT_TRACKER.stop()
-                CURRENT_TRACKER = None
-            conn.close()
-            return jsonify({'running': False})
-            
-        sid, name, tags, start_ts, target_duration = session_row
-        
-        c.execute("SELECT pause_ts FROM breaks WHERE session_id = ? AND resume_ts IS NULL ORDER BY pause_ts DESC LIMIT 1", (sid,))
-        pause_row = c.fetchone()
-        
-        status = 'running' 
-        total_break_time = get_total_break_time(conn, sid)
-        
-        if pause_row:
-            status = 'paused'
-            current_pause_ts = pause_row[0]
-            current_break_duration = (int(time.time()) - current_pause_ts)
-            if current_break_duration > 0:
-                total_break_time += current_break_duration
-            
-            if CURRENT_TRACKER and CURRENT_TRACKER.is_alive():
-                CURRENT_TRACKER.stop()
-                CURRENT_TRACKER.join()
-                CURRENT_TRACKER = None
-        
+        conn = connect(DB_FILE)
+        payload = get_live_status(conn)
         conn.close()
         
-        now = int(time.time())
-        elapsed_focus_time = (now - start_ts) - total_break_time
-        if elapsed_focus_time < 0: elapsed_focus_time = 0
-        
-        is_countdown = target_duration > 0
-        final_display_time = elapsed_focus_time
-        
-        if is_countdown:
-            # This is a countdown timer, calculate time left
-            time_left = target_duration - elapsed_focus_time
-            if time_left < 0: time_left = 0
-            final_display_time = time_left
-            
-        return jsonify({
-            'running': True,
-            'status': status, 
-            'session': {'id': sid, 'name': name, 'tags': tags, 'start_ts': start_ts, 'target_duration': target_duration}, 
-            'elapsed': elapsed_focus_time,  # This is the raw count-up
-            'elapsed_str': sec_to_hhmmss(final_display_time), # THIS IS THE FIX. This now holds the countdown.
-            'is_countdown': is_countdown
-        })
+        # Keep the tracker in line with the DB (e.g. session stopped from another tab)
+        if not payload['running']:
+            tracker_command('stop')
+        elif payload['status'] == 'paused':
+            tracker_command('pause', payload['session']['id'])
+        else:
+            # A restarted daemon comes up idle; pick the running session back up
+            sid = payload['session']['id']
+            tracker = tracker_command('status')
+            if tracker.get('success') and (not tracker.get('tracking') or tracker.get('session_id') != sid):
+                tracker_command('start', sid)
+            
+        return jsonify(payload)
 
     @app.route('/api/all_sessions')
     def api_all_sessions():
@@ -282,13 +284,13 @@ def create_app():
         search_tag = request.args.get('tag', '').strip()
 
         try:
-            conn = sqlite3.connect(DB_FILE)
+            conn = connect(DB_FILE)
             c = conn.cursor()
             
             query = 'SELECT id, name, tags, start_ts, end_ts, duration FROM sessions'
             params = []
             
-            where_clauses = []
+            where_clauses = ['deleted = 0']
             if search_name:
                 where_clauses.append('name LIKE ?')
                 params.append(f'%{search_name}%')
@@ -297,8 +299,7 @@ def create_app():
                 where_clauses.append('tags LIKE ?')
                 params.append(f'%{search_tag}%')
 
-            if where_clauses:
-                query += ' WHERE ' + ' AND '.join(where_clauses)
+            query += ' WHERE ' + ' AND '.join(where_clauses)
                 
             query += ' ORDER BY start_ts DESC'
             
@@ -306,6 +307,12 @@ def create_app():
             rows = c.fetchall()
             conn.close()
             
+            if wants_compact():
+                columns = list(zip(*rows)) or [()] * 6
+                compact = dict(zip(('id', 'name', 'tags', 'start_ts', 'end_ts', 'duration'), columns))
+                compact['duration'] = [d or 0 for d in compact['duration']]
+                return jsonify({'success': True, 'format': 'compact', 'sessions': compact})
+            
             sessions = []
             for r in rows:
                 sessions.append({
@@ -326,10 +333,10 @@ def create_app():
     @app.route('/api/session/<int:session_id>/summary')
     def api_get_session_summary(session_id):
         try:
-            conn = sqlite3.connect(DB_FILE)
+            conn = connect(DB_FILE)
             c = conn.cursor()
             
-            c.execute("SELECT name, tags, start_ts, end_ts, duration FROM sessions WHERE id=?", (session_id,))
+            c.execute("SELECT name, tags, start_ts, end_ts, duration FROM sessions WHERE id=? AND deleted = 0", (session_id,))
             session_row = c.fetchone()
             if not session_row:
                 conn.close()
@@ -423,37 +430,161 @@ def create_app():
             if 'conn' in locals() and conn: conn.close()
             return jsonify({'success': False, 'error': str(e)}), 500
 
+    @app.route('/api/session/<int:session_id>/timeline')
+    def api_get_session_timeline(session_id):
+        try:
+            points = int(request.args.get('points', timeline.DEFAULT_POINTS))
+        except ValueError:
+            return jsonify({'success': False, 'error': 'points must be an integer'}), 400
+        points = max(1, min(points, timeline.MAX_POINTS))
+        
+        try:
+            conn = connect(DB_FILE)
+            c = conn.cursor()
+            c.execute("SELECT start_ts, end_ts, rev FROM sessions WHERE id=? AND deleted = 0", (session_id,))
+            session_row = c.fetchone()
+            if not session_row:
+                conn.close()
+                return jsonify({'success': False, 'error': 'Session not found'}), 404
+            
+            start_ts, end_ts, rev = session_row
+            finished = end_ts > 0
+            version = etag = None
+            if finished:
+                # Late samples or a merge can still change a finished session: revalidate
+                version = timeline.content_version(conn, session_id, rev)
+                etag = timeline.etag(session_id, start_ts, end_ts, points, version)
+                if request.if_none_match.contains_weak(etag):
+                    conn.close()
+                    response = Response(status=304)
+                    response.set_etag(etag, weak=True)
+                    response.headers['Cache-Control'] = 'private, no-cache'
+                    return response
+            else:
+                end_ts = int(time.time())
+            
+            bucket_seconds, buckets = timeline.get_timeline(conn, session_id, start_ts, end_ts, points, finished, version)
+            conn.close()
+            
+            response = jsonify({
+                'success': True,
+                'session_id': session_id,
+                'start_ts': start_ts,
+                'end_ts': end_ts,
+                'finished': finished,
+                'bucket_seconds': bucket_seconds,
+                'timeline': buckets
+            })
+            if finished:
+                response.set_etag(etag, weak=True) # Weak: gzip and identity bodies share it
+                response.headers['Cache-Control'] = 'private, no-cache'
+            return response
+        except Exception as e:
+            print(f"Error getting timeline: {e}")
+            if 'conn' in locals() and conn: conn.close()
+            return jsonify({'success': False, 'error': str(e)}), 500
+
     @app.route('/api/session/delete', methods=['POST'])
     def api_delete_session():
         data = request.get_json() or {}
         sid = data.get('session_id')
         if not sid:
             return jsonify({'success': False, 'error': 'no session_id'}), 400
+        if not isinstance(sid, int) or isinstance(sid, bool):
+            return jsonify({'success': False, 'error': 'session_id must be an integer'}), 400
+
+        try:
+            tracker_command('stop', sid) # In case it is the running session
+            conn = connect(DB_FILE)
+            job_id, _ = deletion.enqueue_delete(conn, [sid])
+            conn.close()
             
+            # Rows are removed in the background; the session is already hidden
+            return jsonify({'success': True, 'session_id': sid, 'job_id': job_id})
+        except Exception as e:
+            print(f"Error deleting session {sid}: {e}")
+            if 'conn' in locals() and conn: conn.close()
+            return jsonify({'success': False, 'error': str(e)}), 500
+
+    @app.route('/api/sessions/bulk_delete', methods=['POST'])
+    def api_bulk_delete_sessions():
+        # Body: {"session_ids": [..]} or {"start_date": "YYYY-MM-DD", "end_date": "YYYY-MM-DD"}
+        data = request.get_json() or {}
+        session_ids = data.get('session_ids')
+        start_date_str = data.get('start_date')
+        end_date_str = data.get('end_date')
+        
         try:
-            conn = sqlite3.connect(DB_FILE)
+            conn = connect(DB_FILE)
             c = conn.cursor()
             
-            c.execute("DELETE FROM activity_log WHERE session_id = ?", (sid,))
-            c.execute("DELETE FROM breaks WHERE session_id = ?", (sid,))
-            c.execute("DELETE FROM sessions WHERE id = ?", (sid,))
+            if session_ids:
+                if not isinstance(session_ids, list):
+                    conn.close()
+                    return jsonify({'success': False, 'error': 'session_ids must be a list'}), 400
+                if not all(isinstance(sid, int) and not isinstance(sid, bool) for sid in session_ids):
+                    conn.close()
+                    return jsonify({'success': False, 'error': 'session_ids must be integers'}), 400
+                ids = session_ids
+            elif start_date_str and end_date_str:
+                try:
+                    start_date_obj = datetime.datetime.strptime(start_date_str, '%Y-%m-%d').date()
+                    end_date_obj = datetime.datetime.strptime(end_date_str, '%Y-%m-%d').date()
+                except ValueError:
+                    conn.close()
+                    return jsonify({'success': False, 'error': 'Invalid date format. Use YYYY-MM-DD.'}), 400
+                start_ts = int(datetime.datetime.combine(start_date_obj, datetime.time.min).timestamp())
+                end_ts = int(datetime.datetime.combine(end_date_obj, datetime.time.max).timestamp())
+                c.execute("SELECT id FROM sessions WHERE deleted = 0 AND start_ts >= ? AND start_ts <= ?", (start_ts, end_ts))
+                ids = [row[0] for row in c.fetchall()]
+            else:
+                conn.close()
+                return jsonify({'success': False, 'error': 'no session_ids or date range'}), 400
+            
+            # Stop tracking if the running session is being deleted
+            c.execute("SELECT id FROM sessions WHERE end_ts = 0 AND deleted = 0 ORDER BY start_ts DESC LIMIT 1")
+            running = c.fetchone()
             
-            conn.commit()
+            job_id, marked = deletion.enqueue_delete(conn, ids)
             conn.close()
             
-            return jsonify({'success': True, 'session_id': sid})
+            if running and running[0] in marked:
+                tracker_command('stop', running[0])
+            
+            return jsonify({'success': True, 'job_id': job_id, 'sessions': len(marked)})
         except Exception as e:
-            print(f"Error deleting session {sid}: {e}")
+            print(f"Error in bulk delete: {e}")
             if 'conn' in locals() and conn: conn.close()
             return jsonify({'success': False, 'error': str(e)}), 500
 
+    @app.route('/api/delete_jobs/<int:job_id>')
+    def api_delete_job_status(job_id):
+        conn = connect(DB_FILE)
+        job = deletion.get_job(conn, job_id)
+        conn.close()
+        if not job:
+            return jsonify({'success': False, 'error': 'job not found'}), 404
+        return jsonify({'success': True, 'job': job})
+
+    @app.route('/api/backup', methods=['POST'])
+    def api_backup():
+        # Body (optional): {"compress": true}
+        data = request.get_json(silent=True) or {}
+        worker = backup.start_worker(DB_FILE)
+        started = worker.request(compress=bool(data.get('compress', backup.BACKUP_COMPRESS)))
+        return jsonify({'success': True, 'started': started, 'status': worker.status()})
+
+    @app.route('/api/backup/status')
+    def api_backup_status():
+        return jsonify({'success': True, 'status': backup.start_worker(DB_FILE).status()})
+
     @app.route('/api/tags')
     def api_get_tags():
         try:
-            conn = sqlite3.connect(DB_FILE)
+            conn = connect(DB_FILE)
             c = conn.cursor()
             
-            c.execute("SELECT tags FROM sessions WHERE tags IS NOT NULL AND tags != ''")
+            c.execute("SELECT tags FROM sessions WHERE tags IS NOT NULL AND tags != '' AND deleted = 0")
             rows = c.fetchall()
             conn.close()
             
@@ -510,7 +641,7 @@ def create_app():
                 start_ts = int(datetime.datetime.combine(start_of_month, datetime.time.min).timestamp())
             
             # --- 3. Build Base SQL Filters ---
-            sql_filters = "WHERE duration > 0 AND start_ts >= ? AND start_ts <= ?"
+            sql_filters = "WHERE duration > 0 AND deleted = 0 AND start_ts >= ? AND start_ts <= ?"
             sql_params = [start_ts, end_ts]
             
             if filter_tag != 'all':
@@ -518,7 +649,7 @@ def create_app():
                 sql_params.append(f'%{filter_tag}%')
 
             # --- 4. Run Queries ---
-            conn = sqlite3.connect(DB_FILE)
+            conn = connect(DB_FILE)
             c = conn.cursor()
 
             # --- Overview Stats (Uses filtered data) ---
@@ -540,6 +671,7 @@ def create_app():
             
             top_apps_labels = []
             top_apps_data = []
+            top_apps_seconds = []
             if session_ids:
                 placeholders = ','.join('?' for _ in session_ids)
                 c.execute(f'''
@@ -553,6 +685,7 @@ def create_app():
                 for row in top_apps_raw:
                     top_apps_labels.append(row[0])
                     top_apps_data.append(round((row[1] * LOG_INTERVAL_SECONDS) / 3600.0, 2))
+                    top_apps_seconds.append(int(row[1] * LOG_INTERVAL_SECONDS))
 
             # --- Top Tags (Uses filtered data) ---
             c.execute(f"SELECT tags, duration FROM sessions {sql_filters}", tuple(sql_params))
@@ -571,17 +704,36 @@ def create_app():
             sorted_tags = sorted(tag_durations.items(), key=lambda item: item[1], reverse=True)
             top_tags_labels = []
             top_tags_data = []
+            top_tags_seconds = []
             other_duration = 0
             for i, (tag, duration) in enumerate(sorted_tags):
                 if i < 7:
                     top_tags_labels.append(tag)
                     top_tags_data.append(round(duration / 3600.0, 2))
+                    top_tags_seconds.append(duration)
                 else:
                     other_duration += duration
             
             if other_duration > 0:
                 top_tags_labels.append('Other')
                 top_tags_data.append(round(other_duration / 3600.0, 2))
+                top_tags_seconds.append(other_duration)
+            
+            if wants_compact():
+                # Raw seconds per local day; no per-day label formatting
+                first_day = epoch_day(datetime.date.fromtimestamp(start_ts))
+                last_day = epoch_day(datetime.date.fromtimestamp(end_ts))
+                c.execute(f"SELECT {SQL_EPOCH_DAY} AS day, SUM(duration) FROM sessions {sql_filters} GROUP BY day", tuple(sql_params))
+                trend = daily_seconds(c.fetchall(), first_day, last_day)
+                conn.close()
+                return jsonify({
+                    'success': True,
+                    'format': 'compact',
+                    'overview': {'total_sessions': total_sessions, 'total_seconds': total_duration_sec, 'avg_seconds': int(avg_duration_sec)},
+                    'top_apps': {'labels': top_apps_labels, 'seconds': top_apps_seconds},
+                    'top_tags': {'labels': top_tags_labels, 'seconds': top_tags_seconds},
+                    'daily_trend': {'start_day': first_day, 'seconds': trend}
+                })
             
             # --- Productivity Over Time (Analytics Page - USES FILTERS) ---
             c.execute(f'''
@@ -635,7 +787,7 @@ def create_app():
     @app.route('/api/dashboard_stats')
     def api_dashboard_stats():
         try:
-            conn = sqlite3.connect(DB_FILE)
+            conn = connect(DB_FILE)
             c = conn.cursor()
 
             # --- 1. Get Today's Focus (Corrected) ---
@@ -646,7 +798,7 @@ def create_app():
             c.execute('''
                 SELECT SUM(duration) 
                 FROM sessions 
-                WHERE DATE(start_ts, 'unixepoch', 'localtime') = ? AND end_ts > 0
+                WHERE DATE(start_ts, 'unixepoch', 'localtime') = ? AND end_ts > 0 AND deleted = 0
             ''', (today_str,))
             today_completed_duration = c.fetchone()[0] or 0
             
@@ -654,7 +806,7 @@ def create_app():
             c.execute('''
                 SELECT id, start_ts, target_duration 
                 FROM sessions 
-                WHERE DATE(start_ts, 'unixepoch', 'localtime') = ? AND end_ts = 0
+                WHERE DATE(start_ts, 'unixepoch', 'localtime') = ? AND end_ts = 0 AND deleted = 0
                 ORDER BY start_ts DESC LIMIT 1
             ''', (today_str,))
             running_session = c.fetchone()
@@ -675,11 +827,30 @@ def create_app():
             start_date_30 = today - datetime.timedelta(days=29)
             start_ts_30 = int(datetime.datetime.combine(start_date_30, datetime.time.min).timestamp())
             
+            if wants_compact():
+                first_day, last_day = epoch_day(start_date_30), epoch_day(today)
+                c.execute(f'''
+                    SELECT {SQL_EPOCH_DAY} AS day, SUM(duration)
+                    FROM sessions
+                    WHERE start_ts >= ? AND duration > 0 AND deleted = 0
+                    GROUP BY day
+                ''', (start_ts_30,))
+                trend = daily_seconds(c.fetchall(), first_day, last_day)
+                trend[-1] += today_running_duration
+                conn.close()
+                return jsonify({
+                    'success': True,
+                    'format': 'compact',
+                    'todays_focus_seconds': total_today_duration,
+                    'daily_trend': {'start_day': first_day, 'seconds': trend}
+                })
+            
             c.execute('''
                 SELECT DATE(start_ts, 'unixepoch', 'localtime') as session_date, 
                        SUM(duration) as total_duration
                 FROM sessions
-                WHERE start_ts >= ? AND duration > 0
+                WHERE start_ts >= ? AND duration > 0 AND deleted = 0
+                GROUP BY session_date
             ''', (start_ts_30,))
             
             daily_rows = c.fetchall()
@@ -715,4 +886,49 @@ def create_app():
             if 'conn' in locals() and conn: conn.close()
             return jsonify({'success': False, 'error': str(e)}), 500
 
+    @app.route('/api/heatmap')
+    def api_heatmap():
+        # Per-day focus for one calendar year, from the daily index (compact format)
+        try:
+            year = int(request.args.get('year', datetime.date.today().year))
+            if not 1970 <= year <= 9999:
+                raise ValueError
+        except ValueError:
+            return jsonify({'success': False, 'error': 'Invalid year'}), 400
+        try:
+            conn = connect(DB_FILE)
+            data = daily.heatmap(conn.cursor(), year)
+            conn.close()
+            return jsonify(dict(data, success=True, format='compact'))
+        except Exception as e:
+            print(f"Error in heatmap: {e}")
+            if 'conn' in locals() and conn: conn.close()
+            return jsonify({'success': False, 'error': str(e)}), 500
+
+    @app.route('/api/streaks')
+    def api_streaks():
+        try:
+            conn = connect(DB_FILE)
+            data = daily.streaks(conn.cursor())
+            conn.close()
+            return jsonify(dict(data, success=True))
+        except Exception as e:
+            print(f"Error in streaks: {e}")
+            if 'conn' in locals() and conn: conn.close()
+            return jsonify({'success': False, 'error': str(e)}), 500
+
+    @app.route('/api/metrics')
+    def api_metrics():
+        snapshots = {'web': metrics.snapshot()}
+        try:
+            snapshots['tracker'] = send_command('metrics').get('metrics')
+        except NO_DAEMON_ERRORS:
+            pass # No daemon: the in-process tracker reports into the web registry
+        except OSError as e:
+            print(f"Tracker daemon did not answer 'metrics': {e}")
+            
+        if request.args.get('format') == 'json':
+            return jsonify({'success': True, 'processes': snapshots})
+        return Response(metrics.render_prometheus(snapshots), mimetype='text/plain; version=0.0.4')
+
     return app
\ No newline at end of file
@@ -0,0 +1,65 @@
+# Session helpers shared by the web routes and the tracker daemon (no Flask imports).
+import time
+
+# --- HELPER: Format Time ---
+def sec_to_hhmmss(seconds):
+    seconds = int(seconds or 0)
+    h = seconds // 3600
+    m = (seconds % 3600) // 60
+    s = seconds % 60
+    return f"{h}h {m:02d}m {s:02d}s"
+
+# --- HELPER: Get total break time ---
+def get_total_break_time(conn, session_id):
+    c = conn.cursor()
+    c.execute("SELECT SUM(resume_ts - pause_ts) FROM breaks WHERE session_id = ? AND resume_ts IS NOT NULL", (session_id,))
+    total_break = c.fetchone()[0] or 0
+    return total_break
+
+# --- HELPER: Live status of the running session (the /api/status payload) ---
+def get_live_status(conn):
+    c = conn.cursor()
+    
+    # Get target_duration as well
+    c.execute('SELECT id, name, tags, start_ts, target_duration FROM sessions WHERE end_ts=0 AND deleted = 0 ORDER BY start_ts DESC LIMIT 1')
+    session_row = c.fetchone()
+    
+    if not session_row:
+        return {'running': False}
+        
+    sid, name, tags, start_ts, target_duration = session_row
+    
+    c.execute("SELECT pause_ts FROM breaks WHERE session_id = ? AND resume_ts IS NULL ORDER BY pause_ts DESC LIMIT 1", (sid,))
+    pause_row = c.fetchone()
+    
+    status = 'running' 
+    total_break_time = get_total_break_time(conn, sid)
+    
+    if pause_row:
+        status = 'paused'
+        current_pause_ts = pause_row[0]
+        current_break_duration = (int(time.time()) - current_pause_ts)
+        if current_break_duration > 0:
+            total_break_time += current_break_duration
+    
+    now = int(time.time())
+    elapsed_focus_time = (now - start_ts) - total_break_time
+    if elapsed_focus_time < 0: elapsed_focus_time = 0
+    
+    is_countdown = target_duration > 0
+    final_display_time = elapsed_focus_time
+    
+    if is_countdown:
+        # This is a countdown timer, calculate time left
+        time_left = target_duration - elapsed_focus_time
+        if time_left < 0: time_left = 0
+        final_display_time = time_left
+        
+    return {
+        'running': True,
+        'status': status, 
+        'session': {'id': sid, 'name': name, 'tags': tags, 'start_ts': start_ts, 'target_duration': target_duration}, 
+        'elapsed': elapsed_focus_time,  # This is the raw count-up
+        'elapsed_str': sec_to_hhmmss(final_display_time), # This holds the countdown for timers
+        'is_countdown': is_countdown
+    }
@@ -0,0 +1,251 @@
+"""
+Merging StudyTrack databases from several machines.
+
+Every database gets a random host_id and every session a random uuid and an
+origin (the host_id it was created on), so sessions can be matched across
+hosts even though their integer ids collide. Triggers keep a per-database
+change counter (sync_meta 'rev'): any change to a session or its breaks
+stamps the session with the next rev, and a hard delete leaves a row in
+sync_tombstones with its rev.
+
+merge() pulls another database into this one. For each source host it keeps
+high-water marks in merge_state (last rev and last activity_log id seen), so
+a merge only reads what changed since the previous one:
+
+  1. finished sessions with rev > mark are inserted or updated by uuid, and
+     their breaks and activity rows are replaced. Sessions whose content
+     already matches are skipped, which stops two hosts that merge each
+     other from copying the same sessions back and forth forever.
+  2. activity rows with id > mark that belong to sessions created on the
+     source host (samples replayed after the session was stopped) are
+     appended.
+  3. sessions deleted on the source are deleted here through the normal
+     background delete job.
+
+The per-day index (daily.py) is refreshed for every day the merge touched.
+
+Running and paused sessions are not merged until they are stopped. When the
+same session was edited on both hosts, the last merge wins. Everything is
+applied in one transaction, so re-running a merge (or one that was
+interrupted) is safe.
+"""
+import time
+import uuid
+import sqlite3
+from pathlib import Path
+
+from . import daily, deletion
+from .config import DB_FILE
+from .db import connect
+
+SESSION_COLUMNS = ('name', 'tags', 'start_ts', 'end_ts', 'duration', 'target_duration')
+
+
+class MergeError(Exception):
+    pass
+
+
+def init_tables(c):
+    """
+    Creates the sync tables and triggers and backfills uuid/origin for
+    existing sessions. Expects the sessions.uuid/origin/rev columns to exist.
+    """
+    c.execute("CREATE TABLE IF NOT EXISTS sync_meta (key TEXT PRIMARY KEY, value)")
+    c.execute("INSERT OR IGNORE INTO sync_meta (key, value) VALUES ('host_id', ?)", (uuid.uuid4().hex,))
+    c.execute("INSERT OR IGNORE INTO sync_meta (key, value) VALUES ('rev', 0)")
+    c.execute("CREATE TABLE IF NOT EXISTS sync_tombstones (uuid TEXT PRIMARY KEY, rev INTEGER)")
+    c.execute('''
+    CREATE TABLE IF NOT EXISTS merge_state (
+        source_host TEXT PRIMARY KEY,
+        source_path TEXT,
+        rev INTEGER DEFAULT 0,
+        activity_id INTEGER DEFAULT 0,
+        merged_ts INTEGER
+    )
+    ''')
+
+    # Any change to a session (or its breaks) stamps it with the next rev.
+    # Updates that set rev themselves don't fire the update trigger again.
+    c.execute('''
+    CREATE TRIGGER IF NOT EXISTS sync_sessions_insert AFTER INSERT ON sessions
+    BEGIN
+        UPDATE sync_meta SET value = value + 1 WHERE key = 'rev';
+        UPDATE sessions SET
+            rev = (SELECT value FROM sync_meta WHERE key = 'rev'),
+            uuid = COALESCE(NEW.uuid, lower(hex(randomblob(16)))),
+            origin = COALESCE(NEW.origin, (SELECT value FROM sync_meta WHERE key = 'host_id'))
+        WHERE id = NEW.id;
+    END
+    ''')
+    c.execute('''
+    CREATE TRIGGER IF NOT EXISTS sync_sessions_update AFTER UPDATE ON sessions WHEN NEW.rev IS OLD.rev
+    BEGIN
+        UPDATE sync_meta SET value = value + 1 WHERE key = 'rev';
+        UPDATE sessions SET rev = (SELECT value FROM sync_meta WHERE key = 'rev') WHERE id = NEW.id;
+    END
+    ''')
+    c.execute('''
+    CREATE TRIGGER IF NOT EXISTS sync_sessions_delete AFTER DELETE ON sessions WHEN OLD.uuid IS NOT NULL
+    BEGIN
+        UPDATE sync_meta SET value = value + 1 WHERE key = 'rev';
+        INSERT OR REPLACE INTO sync_tombstones (uuid, rev) VALUES (OLD.uuid, (SELECT value FROM sync_meta WHERE key = 'rev'));
+    END
+    ''')
+    for event, row in (('INSERT', 'NEW'), ('UPDATE', 'NEW'), ('DELETE', 'OLD')):
+        c.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS sync_breaks_{event.lower()} AFTER {event} ON breaks
+        BEGIN
+            UPDATE sessions SET rev = rev WHERE id = {row}.session_id;
+        END
+        ''')
+
+    c.execute('''UPDATE sessions SET uuid = lower(hex(randomblob(16))),
+                 origin = COALESCE(origin, (SELECT value FROM sync_meta WHERE key = 'host_id'))
+                 WHERE uuid IS NULL''')
+    c.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_sessions_uuid ON sessions (uuid)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_sessions_rev ON sessions (rev)")
+
+
+def host_id(c, schema='main'):
+    c.execute(f"SELECT value FROM {schema}.sync_meta WHERE key = 'host_id'")
+    row = c.fetchone()
+    return row[0] if row else None
+
+
+def _fingerprint(c, schema, session_id):
+    """What has to match for two copies of a session to count as identical."""
+    c.execute(f"SELECT {', '.join(SESSION_COLUMNS)} FROM {schema}.sessions WHERE id = ?", (session_id,))
+    row = c.fetchone()
+    c.execute(f"SELECT pause_ts, resume_ts, kind FROM {schema}.breaks WHERE session_id = ? ORDER BY pause_ts, resume_ts", (session_id,))
+    breaks = c.fetchall()
+    c.execute(f"SELECT COUNT(*), MAX(timestamp) FROM {schema}.activity_log WHERE session_id = ?", (session_id,))
+    return row, breaks, c.fetchone()
+
+
+def _copy_children(c, src_id, dst_id):
+    c.execute("DELETE FROM main.breaks WHERE session_id = ?", (dst_id,))
+    c.execute("DELETE FROM main.activity_log WHERE session_id = ?", (dst_id,))
+    c.execute('''INSERT INTO main.breaks (session_id, pause_ts, resume_ts, kind)
+                 SELECT ?, pause_ts, resume_ts, kind FROM src.breaks WHERE session_id = ?''', (dst_id, src_id))
+    c.execute('''INSERT INTO main.activity_log (session_id, timestamp, app_name, window_title)
+                 SELECT ?, timestamp, app_name, window_title FROM src.activity_log WHERE session_id = ?
+                 ORDER BY id''', (dst_id, src_id))
+    return c.rowcount
+
+
+def merge(source_path, db_file=DB_FILE):
+    """
+    Pulls everything that changed in `source_path` since the last merge from
+    it into `db_file`. Returns a dict of counts.
+    """
+    source_path = Path(source_path).resolve()
+    if not source_path.is_file():
+        raise MergeError(f"{source_path} does not exist")
+    if source_path == Path(db_file).resolve():
+        raise MergeError("Cannot merge a database into itself")
+
+    t0 = time.perf_counter()
+    conn = connect(db_file, uri=True)
+    try:
+        c = conn.cursor()
+        c.execute("ATTACH DATABASE ? AS src", (source_path.as_uri() + '?mode=ro',))
+        try:
+            src_host = host_id(c, 'src')
+        except sqlite3.OperationalError:
+            src_host = None
+        if src_host is None:
+            raise MergeError(f"{source_path} has no sync metadata; run this version of StudyTrack on that machine once first")
+        if src_host == host_id(c):
+            raise MergeError(f"{source_path} is a copy of this database (same host id)")
+
+        c.execute("BEGIN IMMEDIATE")
+        c.execute("SELECT rev, activity_id FROM merge_state WHERE source_host = ?", (src_host,))
+        row = c.fetchone()
+        rev_mark, activity_mark = row if row else (0, 0)
+        c.execute("SELECT value FROM src.sync_meta WHERE key = 'rev'")
+        src_rev = c.fetchone()[0]
+        c.execute("SELECT COALESCE(MAX(id), 0) FROM src.activity_log")
+        src_activity = c.fetchone()[0]
+
+        stats = {'source_host': src_host, 'added': 0, 'updated': 0, 'unchanged': 0,
+                 'deleted': 0, 'activity_rows': 0}
+
+        # --- 1. Sessions changed on the source ---
+        c.execute(f'''SELECT id, uuid, origin, deleted, {', '.join(SESSION_COLUMNS)} FROM src.sessions
+                      WHERE rev > ? AND end_ts != 0 ORDER BY rev''', (rev_mark,))
+        changed = c.fetchall()
+        to_delete = []
+        touched = []        # Sessions added or updated, for the per-day index
+        old_days = set()    # Days updated sessions covered before the merge
+        for src_id, sid_uuid, origin, src_deleted, *values in changed:
+            c.execute("SELECT id, deleted FROM main.sessions WHERE uuid = ?", (sid_uuid,))
+            local = c.fetchone()
+            if src_deleted:
+                if local and not local[1]:
+                    to_delete.append(local[0])
+                continue
+            if local and local[1]: # Deleted here; the local delete wins
+                continue
+            if local is None:
+                c.execute(f'''INSERT INTO main.sessions (uuid, origin, {', '.join(SESSION_COLUMNS)})
+                              VALUES (?, ?, {', '.join('?' for _ in SESSION_COLUMNS)})''', [sid_uuid, origin] + values)
+                new_id = c.lastrowid
+                stats['activity_rows'] += _copy_children(c, src_id, new_id)
+                touched.append(new_id)
+                stats['added'] += 1
+            elif _fingerprint(c, 'src', src_id) == _fingerprint(c, 'main', local[0]):
+                stats['unchanged'] += 1
+            else:
+                old_days |= daily.session_days(c, [local[0]])
+                c.execute(f"UPDATE main.sessions SET {', '.join(col + ' = ?' for col in SESSION_COLUMNS)} WHERE id = ?",
+                          values + [local[0]])
+                stats['activity_rows'] += _copy_children(c, src_id, local[0])
+                touched.append(local[0])
+                stats['updated'] += 1
+
+        # --- 2. Late activity rows of the source's own, unchanged sessions ---
+        c.execute('''
+            INSERT INTO main.activity_log (session_id, timestamp, app_name, window_title)
+            SELECT t.id, a.timestamp, a.app_name, a.window_title
+            FROM src.activity_log a
+            JOIN src.sessions s ON s.id = a.session_id
+            JOIN main.sessions t ON t.uuid = s.uuid
+            WHERE a.id > ? AND s.rev <= ? AND s.origin = ? AND s.end_ts != 0 AND s.deleted = 0 AND t.deleted = 0
+            ORDER BY a.id
+        ''', (activity_mark, rev_mark, src_host))
+        late_rows = c.rowcount
+        if late_rows:
+            stats['activity_rows'] += late_rows
+            # Stamp the sessions so hosts merging from us pick the rows up too
+            c.execute('''
+                UPDATE main.sessions SET rev = rev WHERE id IN (
+                    SELECT t.id FROM src.activity_log a
+                    JOIN src.sessions s ON s.id = a.session_id
+                    JOIN main.sessions t ON t.uuid = s.uuid
+                    WHERE a.id > ? AND s.rev <= ? AND s.origin = ?)
+            ''', (activity_mark, rev_mark, src_host))
+
+        # --- 3. Sessions deleted on the source ---
+        c.execute('''SELECT t.id FROM src.sync_tombstones d JOIN main.sessions t ON t.uuid = d.uuid
+                     WHERE d.rev > ? AND t.deleted = 0''', (rev_mark,))
+        to_delete.extend(row[0] for row in c.fetchall())
+
+        c.execute('''INSERT OR REPLACE INTO merge_state (source_host, source_path, rev, activity_id, merged_ts)
+                     VALUES (?, ?, ?, ?, ?)''', (src_host, str(source_path), src_rev, src_activity, int(time.time())))
+        daily.refresh_sessions(c, touched, old_days)
+        # Marks the sessions deleted, queues their removal and commits everything
+        _, marked = deletion.enqueue_delete(conn, to_delete)
+        stats['deleted'] = len(marked)
+    except BaseException:
+        if conn.in_transaction:
+            conn.rollback()
+        raise
+    finally:
+        try:
+            conn.execute("DETACH DATABASE src")
+        except sqlite3.Error:
+            pass
+        conn.close()
+
+    stats['seconds'] = round(time.perf_counter() - t0, 3)
+    return stats
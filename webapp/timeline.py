@@ -0,0 +1,106 @@
+"""
+Downsampled session timelines.
+
+build_timeline() walks a session's activity rows once, in timestamp order,
+and folds them into a fixed number of buckets. Memory and payload size
+depend on the number of buckets, not on the length of the session.
+
+Timelines of finished sessions are kept in a small LRU cache. They can
+still change after the session ends (journaled samples replayed late, a
+merge replacing its rows, edited breaks), so the cache key includes a
+content version: the session's sync rev plus the count and highest id of
+its activity rows. The same version is used as the HTTP ETag.
+"""
+import threading
+from collections import Counter, OrderedDict
+
+from . import metrics
+
+DEFAULT_POINTS = 120
+MAX_POINTS = 2000
+CACHE_SIZE = 256
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def _bucket(start, samples, app_counts, switches):
+    dominant = app_counts.most_common(1)[0][0] if app_counts else None
+    return {'t': start, 'app': dominant, 'samples': samples, 'switches': switches}
+
+
+def build_timeline(conn, session_id, start_ts, end_ts, points):
+    """
+    Returns (bucket_seconds, buckets). Each bucket holds its start time, the
+    dominant app, the number of samples and the number of app switches.
+    Buckets without samples are included so the x-axis stays uniform.
+    """
+    span = max(1, end_ts - start_ts)
+    bucket_seconds = max(1, -(-span // points)) # ceil
+    n_buckets = -(-span // bucket_seconds)
+
+    buckets = []
+    current = 0
+    samples = 0
+    switches = 0
+    app_counts = Counter()
+    last_app = None
+
+    c = conn.cursor()
+    c.execute('''
+        SELECT timestamp, app_name FROM activity_log
+        WHERE session_id = ? AND timestamp >= ? AND timestamp <= ?
+        ORDER BY timestamp ASC
+    ''', (session_id, start_ts, end_ts))
+    for ts, app in c: # Streams rows; never materializes the whole session
+        index = min((ts - start_ts) // bucket_seconds, n_buckets - 1)
+        while current < index:
+            buckets.append(_bucket(start_ts + current * bucket_seconds, samples, app_counts, switches))
+            current += 1
+            samples = switches = 0
+            app_counts = Counter()
+        samples += 1
+        app_counts[app] += 1
+        if last_app is not None and app != last_app:
+            switches += 1
+        last_app = app
+
+    while current < n_buckets:
+        buckets.append(_bucket(start_ts + current * bucket_seconds, samples, app_counts, switches))
+        current += 1
+        samples = switches = 0
+        app_counts = Counter()
+    return bucket_seconds, buckets
+
+
+def content_version(conn, session_id, rev):
+    """Changes whenever the session, its breaks or its activity rows do."""
+    c = conn.cursor()
+    c.execute("SELECT COUNT(*), MAX(id) FROM activity_log WHERE session_id = ?", (session_id,))
+    count, max_id = c.fetchone()
+    return (rev, count, max_id or 0)
+
+
+def etag(session_id, start_ts, end_ts, points, version):
+    return '-'.join(str(part) for part in (session_id, start_ts, end_ts, points) + tuple(version))
+
+
+def get_timeline(conn, session_id, start_ts, end_ts, points, finished, version=None):
+    """build_timeline() with an LRU cache for finished sessions, keyed by content_version()."""
+    if not finished:
+        return build_timeline(conn, session_id, start_ts, end_ts, points)
+
+    key = (session_id, start_ts, end_ts, points, version)
+    with _cache_lock:
+        if key in _cache:
+            _cache.move_to_end(key)
+            metrics.CACHE_REQUESTS.inc(cache='timeline', result='hit')
+            return _cache[key]
+    metrics.CACHE_REQUESTS.inc(cache='timeline', result='miss')
+
+    result = build_timeline(conn, session_id, start_ts, end_ts, points)
+    with _cache_lock:
+        _cache[key] = result
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+    return result
@@ -1,26 +1,49 @@
 import time
-import sqlite3
+import logging
 import threading
 import subprocess
 import json
 import psutil
 from pathlib import Path
+from . import daily, metrics
+from .db import connect
+from .idle import default_idle_source
+from .journal import journal_for
+from .logutil import RateLimitedLogger
+from .sessions import get_total_break_time
 
 # How often to log the active app (in seconds)
 LOG_INTERVAL = 1.0 # Was 5.0
 
+# After this many seconds idle (see idle.py), or while locked, sampling pauses
+IDLE_THRESHOLD = 300.0
+# While idle, only the idle source is polled, backing off up to this interval
+IDLE_MAX_INTERVAL = 5.0
+
+# Samples go to the journal first; it is replayed into the DB this often
+DRAIN_INTERVAL = 5.0
+# On stop, wait this long for a locked DB so the session's samples land
+FINAL_DRAIN_TIMEOUT = 5.0
+
+log = logging.getLogger('studytrack.tracker')
+
 class ActivityTracker(threading.Thread):
     """
     A background thread that monitors the active Hyprland window
     and logs it to the database.
     """
-    def __init__(self, session_id, db_file):
+    def __init__(self, session_id, db_file, idle_source=None):
         super().__init__()
         self.session_id = session_id
         self.db_file = db_file
         self.running = False
         self._stop_event = threading.Event()
         self.client_cache = {} # Cache for PID -> app_name
+        self._rate_log = RateLimitedLogger(log, interval=60.0)
+        self.idle_source = idle_source if idle_source is not None else default_idle_source()
+        self.idle_since = None # Wall-clock start of the current idle span
+        self.journal = journal_for(db_file)
+        self._next_drain = 0.0
         
     def stop(self):
         """Signals the thread to stop."""
@@ -29,32 +52,103 @@ class ActivityTracker(threading.Thread):
     def run(self):
             """The main loop for the tracking thread."""
             self.running = True
-            print(f"[Tracker] Starting for session {self.session_id} (Hyprland Mode)")
-            
-            # We remove self.last_app and self.last_title, they are no longer needed
-            # self.last_app = None
-            # self.last_title = None
+            log.info("Starting for session %s (Hyprland Mode)", self.session_id)
+
+            # Ticks are scheduled on a fixed cadence so that slow samples
+            # show up as jitter / missed ticks instead of silently drifting.
+            next_tick = time.monotonic()
+            started_at = int(time.time())
+            idle_wait = LOG_INTERVAL
+            self._drain() # Leftovers from an earlier crash
 
             while not self._stop_event.is_set():
+                # --- Idle: skip sampling and back off until input returns ---
+                idle = self._idle_seconds()
+                if idle is not None and idle >= IDLE_THRESHOLD:
+                    if self.idle_since is None:
+                        # A locked screen (inf) has no known start: count from now
+                        idle_start = time.time() - idle if idle != float('inf') else time.time()
+                        self.idle_since = max(started_at, int(idle_start))
+                        log.info("Session %s idle since %s", self.session_id, self.idle_since)
+                    idle_wait = min(idle_wait * 2, IDLE_MAX_INTERVAL)
+                    self._stop_event.wait(idle_wait)
+                    next_tick = time.monotonic()
+                    continue
+                if self.idle_since is not None:
+                    self._end_idle_span()
+                    idle_wait = LOG_INTERVAL
+                    next_tick = time.monotonic()
+
+                lateness = time.monotonic() - next_tick
+                if lateness >= LOG_INTERVAL:
+                    missed = int(lateness // LOG_INTERVAL)
+                    metrics.TRACKER_MISSED_TICKS.inc(missed)
+                    next_tick += missed * LOG_INTERVAL
+                    lateness -= missed * LOG_INTERVAL
+                metrics.TRACKER_JITTER.observe(max(0.0, lateness))
+
                 try:
                     app_name, window_title = self._get_active_window_info()
 
-                    # --- THIS IS THE FIX ---
                     # We must log EVERY sample, not just changes.
-                    # The old "if" statement was the bug.
                     if app_name:
                         self._log_activity_to_db(app_name, window_title)
-                    # ---------------------
+                    else:
+                        metrics.TRACKER_SAMPLES.inc(result='empty')
 
                 except Exception as e:
-                    print(f"[Tracker] Error in loop: {e}")
-                    
-                # Wait for the specified interval
-                self._stop_event.wait(LOG_INTERVAL)
-                
-            print(f"[Tracker] Stopping for session {self.session_id}")
+                    metrics.TRACKER_SAMPLES.inc(result='error')
+                    self._rate_log.log(logging.WARNING, 'loop', "Error in loop: %s", e)
+
+                # Wait until the next scheduled tick
+                next_tick += LOG_INTERVAL
+                self._stop_event.wait(max(0.0, next_tick - time.monotonic()))
+
+            if self.idle_since is not None:
+                self._end_idle_span()
+            self._drain(timeout=FINAL_DRAIN_TIMEOUT)
+            log.info("Stopping for session %s", self.session_id)
             self.running = False
 
+    def _idle_seconds(self):
+        try:
+            return self.idle_source.idle_seconds()
+        except Exception as e:
+            self._rate_log.log(logging.WARNING, 'idle', "Idle source error: %s", e)
+            return None
+
+    def _end_idle_span(self):
+        """
+        Records the idle span as an automatic break. Samples logged before
+        the span was detected are kept; the break is what takes the time out
+        of the session's focus time.
+        """
+        start, end = self.idle_since, int(time.time())
+        self.idle_since = None
+        log.info("Session %s active again after %ss idle", self.session_id, end - start)
+        try:
+            conn = connect(self.db_file)
+            c = conn.cursor()
+            c.execute("SELECT end_ts FROM sessions WHERE id = ?", (self.session_id,))
+            row = c.fetchone()
+            stopped_at = row[0] if row and row[0] else None
+            if stopped_at is not None:
+                end = min(end, stopped_at)
+            c.execute("INSERT INTO breaks (session_id, pause_ts, resume_ts, kind) VALUES (?, ?, ?, 'idle')",
+                      (self.session_id, start, end))
+            if stopped_at is not None:
+                # The session was stopped before this break landed (the stop
+                # request gave up waiting): redo what api_stop computed
+                c.execute("SELECT start_ts FROM sessions WHERE id = ?", (self.session_id,))
+                duration = max(0, stopped_at - c.fetchone()[0] - get_total_break_time(conn, self.session_id))
+                c.execute("UPDATE sessions SET duration = ? WHERE id = ?", (duration, self.session_id))
+                daily.refresh_sessions(c, [self.session_id])
+            conn.commit()
+            conn.close()
+            metrics.TRACKER_IDLE_SPANS.inc()
+        except Exception as e:
+            self._rate_log.log(logging.ERROR, 'db', "DB Error recording idle span: %s", e)
+
     def _get_active_window_info(self):
         """
         Fetches the application name and window title of the
@@ -85,8 +179,10 @@ class ActivityTracker(threading.Thread):
                 try:
                     # Check cache first
                     if pid in self.client_cache:
+                        metrics.CACHE_REQUESTS.inc(cache='tracker_pid', result='hit')
                         app_name = self.client_cache[pid]
                     else:
+                        metrics.CACHE_REQUESTS.inc(cache='tracker_pid', result='miss')
                         proc = psutil.Process(pid)
                         # If the app name is a generic terminal, try to get the child process
                         if app_name.lower() in ['foot', 'kitty', 'alacritty', 'wezterm']:
@@ -105,20 +201,32 @@ class ActivityTracker(threading.Thread):
             # This can happen if no window is focused or hyprctl isn't found
             return "Desktop", "No window focused"
         except Exception as e:
-            print(f"[Tracker] Error getting window info: {e}")
+            self._rate_log.log(logging.WARNING, 'window', "Error getting window info: %s", e)
             return None, None
 
     def _log_activity_to_db(self, app_name, window_title):
-        """Writes the collected activity to the SQLite database."""
+        """
+        Appends the sample to the journal and, every DRAIN_INTERVAL seconds,
+        replays the journal into the database in one batch. If the database
+        is locked or unavailable the samples simply stay journaled.
+        """
         try:
-            conn = sqlite3.connect(self.db_file)
-            c = conn.cursor()
-            c.execute(
-                "INSERT INTO activity_log (session_id, timestamp, app_name, window_title) VALUES (?, ?, ?, ?)",
-                (self.session_id, int(time.time()), app_name, window_title)
-            )
-            conn.commit()
-            conn.close()
-            print(f"[Tracker] Logged: {app_name} - {window_title}")
+            self.journal.append(self.session_id, int(time.time()), app_name, window_title)
+            metrics.TRACKER_SAMPLES.inc(result='logged')
+            self._rate_log.log(logging.DEBUG, 'logged', "Logged: %s - %s", app_name, window_title)
+        except OSError as e:
+            metrics.TRACKER_SAMPLES.inc(result='journal_error')
+            self._rate_log.log(logging.ERROR, 'journal', "Journal Error: %s", e)
+            return
+        if time.monotonic() >= self._next_drain:
+            self._drain()
+
+    def _drain(self, **kwargs):
+        self._next_drain = time.monotonic() + DRAIN_INTERVAL
+        try:
+            written = self.journal.drain(self.db_file, **kwargs)
         except Exception as e:
-            print(f"[Tracker] DB Error: {e}")
\ No newline at end of file
+            self._rate_log.log(logging.ERROR, 'db', "DB Error: %s", e)
+            return
+        if written is None:
+            self._rate_log.log(logging.WARNING, 'db', "Database unavailable, keeping samples in the journal")
\ No newline at end of file